@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from urllib.parse import quote
+
+
+# Benchmarks the whole pipeline on a synthetic corpus built from the statblocks in benchmark_fixtures/, and saves the
+# results as json so runs from different commits can be compared with --compare.
+#
+#   parsePage           pages/s, parsing in this process
+#   main.py             wall time and peak memory of a full uncached run
+#   generate_lookups    time for explore_data.generate_lookups, and for generate_all_lookups (which also builds
+#                       unique_leaves and unique_leaves_counts)
+#   flatten             time for create_csv's recursive flatten and for its compiled flattener, over every monster
+#   create_csv.py       wall time and peak memory
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+fixture_dir = os.path.join(script_dir, "benchmark_fixtures")
+
+# Template statblocks, with the name that gets replaced to make each page unique
+templates = [
+    ("wolf.html", "Wolf", "https://aonprd.com/MonsterDisplay.aspx?ItemName="),
+    ("temple_acolyte.html", "Temple Acolyte", "https://aonprd.com/NPCDisplay.aspx?ItemName=")
+]
+
+
+def makeCorpus(datapath, pages, seed=0):
+    """
+    Write a data folder with urls.txt, class_hds.json and the given number of pages, ready for main.py
+
+    Each page is one of the templates under a new name, with its last paragraph repeated a random number of times so the
+    pages aren't all the same size. The same seed always gives the same corpus.
+    """
+    random.seed(seed)
+    os.makedirs(datapath, exist_ok=True)
+    shutil.copy(os.path.join(fixture_dir, "class_hds.json"), datapath)
+    sources = []
+    for filename, name, urlPrefix in templates:
+        with open(os.path.join(fixture_dir, filename), encoding='utf-8') as fp:
+            sources.append((fp.read(), name, urlPrefix))
+
+    urls = []
+    for i in range(pages):
+        html, name, urlPrefix = sources[i % len(sources)]
+        newName = f"{name} {i // len(sources) + 1}"
+        html = html.replace(name, newName)
+        # Pad out the description, which is whatever follows the last <br/> or header in the statblock
+        end = html.index("</span></td>")
+        start = max(html.rindex("<br/>", 0, end) + len("<br/>"), html.rindex("</h3>", 0, end) + len("</h3>"))
+        html = html[:end] + html[start:end] * random.randint(0, 20) + html[end:]
+        with open(os.path.join(datapath, str(i) + ".html"), 'w', encoding='utf-8') as fp:
+            fp.write(html)
+        urls.append(urlPrefix + quote(newName))
+    with open(os.path.join(datapath, "urls.txt"), 'w') as fp:
+        fp.write("\n".join(urls))
+
+
+def runScript(args, cwd):
+    """
+    Run one of the repo's scripts in a child process
+
+    Returns:
+        tuple: (wall time in seconds, peak RSS in MB or None if the platform can't report it)
+    """
+    t = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux, but bytes on macOS
+        peak = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    else:
+        process.wait()
+        peak = None
+    wall = time.perf_counter() - t
+    if process.returncode != 0:
+        raise RuntimeError(" ".join(args) + " failed with exit code " + str(process.returncode))
+    return wall, peak
+
+def benchParsePage(datapath, repeat):
+    import main
+    main.setupLogging(datapath)
+    main.initWorker(datapath)
+    pages = [(main.readPage(datapath, i, url), url) for i, url in main.loadEntries(datapath)]
+    for html, url in pages:  # Warm up, so first-use regex compiles aren't counted
+        main.parsePage(html, url)
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for html, url in pages:
+            main.parsePage(html, url)
+    t = time.perf_counter() - t
+    return {"pages": len(pages) * repeat, "seconds": t, "pages_per_second": len(pages) * repeat / t}
+
+def benchLookups(datajson, repeat):
+    from explore_data import generate_lookups, generate_all_lookups
+    with open(datajson) as fp:
+        d = json.load(fp)
+    lookups = allLookups = 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        generate_lookups(d)
+        lookups += time.perf_counter() - t
+        t = time.perf_counter()
+        generate_all_lookups(d)
+        allLookups += time.perf_counter() - t
+    return {"generate_lookups_seconds": lookups / repeat, "generate_all_lookups_seconds": allLookups / repeat}
+
+def benchFlatten(datajson, repeat):
+    import create_csv
+    from explore_data import generate_all_lookups
+    with open(datajson) as fp:
+        d = json.load(fp)
+    unique_leaves_counts = generate_all_lookups(d)[2]
+    listCounts = {}
+    shape = {}
+    for pageObject in d.values():
+        create_csv.edit_monster(pageObject, unique_leaves_counts)
+        create_csv.getListCounts(pageObject, listCounts)
+        create_csv.add_shape(pageObject, shape)
+    columns = sorted(create_csv.shape_columns(shape, listCounts, set()))
+    indices = {k: i for i, k in enumerate(columns)}
+    t = time.perf_counter()
+    extract = create_csv.compile_flattener(shape, listCounts, indices)
+    compileTime = time.perf_counter() - t
+
+    recursive = compiled = 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for pageObject in d.values():
+            create_csv.flatten(pageObject, listCounts)
+        recursive += time.perf_counter() - t
+        t = time.perf_counter()
+        for pageObject in d.values():
+            extract(pageObject, [None] * len(columns))
+        compiled += time.perf_counter() - t
+
+    # Check the two agree, so a fast but wrong flattener doesn't go unnoticed
+    for pageObject in d.values():
+        row = [None] * len(columns)
+        extract(pageObject, row)
+        flat = create_csv.flatten(pageObject, listCounts)
+        if row != [flat.get(k) for k in columns]:
+            raise RuntimeError("The compiled flattener disagrees with flatten")
+    return {"columns": len(columns), "recursive_seconds": recursive / repeat, "compiled_seconds": compiled / repeat, "compile_seconds": compileTime}
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=script_dir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flattenResults(results, prefix=""):
+    out = {}
+    for k, v in results.items():
+        if isinstance(v, dict):
+            out.update(flattenResults(v, prefix + k + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[prefix + k] = v
+    return out
+
+def compare(old, new):
+    # pages_per_second is better when higher, everything else (times and memory) when lower
+    old, new = flattenResults(old["results"]), flattenResults(new["results"])
+    lines = [f"{'metric':<45} {'old':>12} {'new':>12} {'change':>8}"]
+    for k in new:
+        if k not in old or old[k] is None or new[k] is None or old[k] == 0:
+            continue
+        change = new[k] / old[k] - 1
+        worse = change < 0 if k.endswith("per_second") else change > 0
+        flag = "  worse" if worse and abs(change) > 0.1 else ""
+        lines.append(f"{k:<45} {old[k]:>12.3f} {new[k]:>12.3f} {change:>+8.1%}{flag}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parser and the scripts that use its output on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=500, help="number of pages in the synthetic corpus (default 500)")
+    parser.add_argument("--repeat", type=int, default=3, help="times to repeat the in-process benchmarks (default 3)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="--jobs to run main.py and create_csv.py with (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic corpus")
+    parser.add_argument("--output", "-o", help="where to save the results (default benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print how these results compare to an earlier results file")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count()
+    if args.jobs > 1 and cpus is not None and args.jobs > cpus:
+        print(f"--jobs {args.jobs} is more than the {cpus} CPU(s) here, so it will show the overhead of the worker processes rather than a speedup")
+
+    commit = gitCommit()
+    output = args.output or os.path.join(script_dir, "benchmark_results", (commit or "results") + ".json")
+    results = {}
+    root = tempfile.mkdtemp(prefix="pfmd_bench_")
+    try:
+        datapath = os.path.join(root, "data")  # create_csv.py writes to data/output.csv, so it runs from root
+        print(f"Building a {args.pages} page corpus in {datapath}")
+        makeCorpus(datapath, args.pages, args.seed)
+
+        print("Timing parsePage...")
+        results["parsePage"] = benchParsePage(datapath, args.repeat)
+
+        print("Timing main.py...")
+        wall, peak = runScript([os.path.join(script_dir, "main.py"), datapath, "--no-cache", "--jobs", str(args.jobs)], root)
+        results["main.py"] = {"wall_seconds": wall, "peak_rss_mb": peak}
+
+        print("Timing generate_lookups...")
+        results["generate_lookups"] = benchLookups(os.path.join(datapath, "data.json"), args.repeat)
+
+        print("Timing flatten...")
+        results["flatten"] = benchFlatten(os.path.join(datapath, "data.json"), args.repeat)
+
+        print("Timing create_csv.py...")
+        wall, peak = runScript([os.path.join(script_dir, "create_csv.py"), os.path.join(datapath, "data.json"), "--jobs", str(args.jobs)], root)
+        results["create_csv.py"] = {"wall_seconds": wall, "peak_rss_mb": peak}
+    finally:
+        shutil.rmtree(root)
+
+    out = {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": cpus,
+        "pages": args.pages,
+        "repeat": args.repeat,
+        "jobs": args.jobs,
+        "seed": args.seed,
+        "results": results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as fp:
+        json.dump(out, fp, indent=1)
+
+    print(json.dumps(results, indent=1))
+    print("Saved to " + output)
+    if args.compare is not None:
+        with open(args.compare) as fp:
+            print(compare(json.load(fp), out))
@@ -0,0 +1,83 @@
+import sys
+import time
+import argparse
+import inspect
+import regex as re
+from tqdm import tqdm
+
+import main
+from main import initWorker, loadEntries, readPage, parsePage, setupLogging
+
+
+# Times splitP against the lookahead regex split it replaced, on the strings parsePage actually feeds it, grouped by the
+# statblock section they come from (spells, skills, feats, attacks...). Also counts the strings the two split differently,
+# which should only be ones with nested parens or brackets.
+
+reference_regexes = {}
+
+def splitPReference(s, handleAnd=False, sep=r', '):
+    if sep not in reference_regexes:
+        reference_regexes[sep] = re.compile(sep + r'(?![^()]*\)|[^\[\]]*\])')
+    o = reference_regexes[sep].split(s)
+    if handleAnd and o[-1].strip().startswith("and "):
+        o[-1] = o[-1].strip()[4:]
+    return o
+
+def sectionNames():
+    # Map each line of parsePage to the "# Get ..." / "# Handle ..." comment of the section it's in
+    lines, first = inspect.getsourcelines(parsePage)
+    sections = {}
+    section = "other"
+    for n, line in enumerate(lines):
+        result = re.search(r'^    # (?:Get|Handle) (?:all )?(.+?)(?: if present)?(?: *[,(].*)?$', line.rstrip())
+        if result is not None:
+            section = result.group(1)
+        sections[first + n] = section
+    return sections
+
+def recordInputs(datapath, entries):
+    sections = sectionNames()
+    inputs = {}
+    splitP = main.splitP
+
+    def recordingSplitP(s, handleAnd=False, sep=r', '):
+        section = sections.get(sys._getframe(1).f_lineno, "other")
+        inputs.setdefault(section, []).append((s, handleAnd, sep))
+        return splitP(s, handleAnd, sep)
+
+    main.splitP = recordingSplitP
+    try:
+        for i, url in tqdm(entries):
+            try:
+                parsePage(readPage(datapath, i, url), url)
+            except Exception:
+                pass
+    finally:
+        main.splitP = splitP
+    return inputs
+
+def timeSplit(split, inputs, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for s, handleAnd, sep in inputs:
+            split(s, handleAnd, sep)
+    return (time.perf_counter() - t) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark splitP on the strings parsePage splits.")
+    parser.add_argument("datapath", nargs="?", default="data/", help="folder containing urls.txt, class_hds.json and the downloaded html files")
+    parser.add_argument("--repeat", type=int, default=20, help="times to split each string")
+    args = parser.parse_args()
+
+    setupLogging(args.datapath)
+    initWorker(args.datapath)
+    inputs = recordInputs(args.datapath, loadEntries(args.datapath))
+
+    print(f"{'section':<40} {'strings':>8} {'longest':>8} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'differ':>7}")
+    for section, strings in sorted(inputs.items(), key=lambda x: -len(x[1])):
+        old = timeSplit(splitPReference, strings, args.repeat)
+        new = timeSplit(main.splitP, strings, args.repeat)
+        differ = sum(splitPReference(*x) != main.splitP(*x) for x in strings)
+        longest = max(len(s) for s, _, _ in strings)
+        print(f"{section[:40]:<40} {len(strings):>8} {longest:>8} {old * 1000:>8.2f} {new * 1000:>8.2f} {old / new:>7.1f}x {differ:>7}")
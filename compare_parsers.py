@@ -0,0 +1,130 @@
+import sys
+import json
+import time
+import argparse
+import regex as re
+from tqdm import tqdm
+from bs4 import BeautifulSoup
+
+import main
+from main import initWorker, loadEntries, readPage, parsePage, setHtmlParser, setupLogging, extractStatblock, normalizeHtml
+
+
+# Parses every page the original way (html.parser over the whole page) and with the faster paths (another BeautifulSoup
+# tree builder, and slicing out the statblock before parsing), and reports every page where the results differ.
+# Run this over the whole corpus before switching main.py to a different --parser, or after changing extractStatblock.
+# It also checks normalizeHtml against the chain of cleanup passes it replaced, and extractStatblock against the selector
+# on some pages with markup the corpus doesn't have yet.
+
+statblock_cases = [
+    '<div id="main-nav"><table><tr><td><span>nav</span></td></tr></table></div><div id="main"><table><tr><td><span>statblock</span></td></tr></table></div>',
+    '<div id="main-wrapper"><div data-id="main"><table><tr><td><span>wrapper</span></td></tr></table></div><div id=main><table><tr><td><span>statblock</span></td></tr></table></div></div>',
+    '<div id="main"><table><tr><td><table><tr><td>nested</td></tr></table><span>statblock</span></td></tr></table><span>after</span></div>',
+    '<div id="main"><span>before</span><table><tr><td>unclosed<td><span>statblock</span></table></div>',
+    '<div id="main"><table><tr><td><b><span>statblock</b> after the bold</span></td></tr></table></div>',
+    '<div id="main"><table><tr><td><p><span>statblock</p> after the paragraph</span></td></tr></table></div>',
+    '<div id="main"><table><tr><td><font><b>x</font><span>statblock<br><img src="a.png"></span></td></tr></table></div>'
+]
+
+def normalizeHtmlReference(html):
+    weird_whitespace = r'(?:\r\n|\r|\xad|' + chr(10) + ')+'
+    html = re.sub(r'(?<=\s+)' + weird_whitespace + r'|' + weird_whitespace + r'(?=\s+)', r'', html)  # First handle weird whitespace bordering regular whitespace - just delete it
+    html = re.sub(weird_whitespace, r' ', html)  # Then handle weird whitespace bordering non-whitespace - replace with a space
+    html = re.sub(r'(?<!<\s*br\s*>\s*)<\s*/\s*br\s*>', r'<br/>', html)
+    html = re.sub(r'<\s*/?\s*br\s*/?\s*>', r'<br/>', html)
+    html = re.sub(r'[−—–‐‑‒―]|&ndash;|&mdash;', "-", html)
+    html = re.sub(r'’', r"'", html)
+    return html
+
+def checkStatblockCases():
+    """
+    Returning None is always fine, since parsePage then parses the whole page
+
+    Returns:
+        list: The statblock_cases where extractStatblock slices out a different span than the selector picks
+    """
+    failures = []
+    for html in statblock_cases:
+        statblock = extractStatblock(html)
+        if statblock is None:
+            continue
+        expected = str(BeautifulSoup(html, "html.parser").select_one("div#main table tr td span"))
+        if str(BeautifulSoup(statblock, "html.parser").find("span")) != expected:
+            failures.append(html)
+    return failures
+
+def normalizeWith(normalize, html):
+    t = time.perf_counter()
+    result = normalize(html)
+    return result, time.perf_counter() - t
+
+def parseWith(html, url, parser, extract):
+    setHtmlParser(parser)
+    main.extract_statblock = extract
+    t = time.perf_counter()
+    try:
+        result = json.dumps(parsePage(html, url))
+    except Exception as e:
+        result = "Exception: " + type(e).__name__ + ": " + str(e)
+    return result, time.perf_counter() - t
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the faster parsing paths give the same database as parsing whole pages with html.parser.")
+    parser.add_argument("datapath", nargs="?", default="data/", help="folder containing urls.txt, class_hds.json and the downloaded html files")
+    parser.add_argument("--parser", default="lxml", help="tree builder to check (default lxml; use html.parser to check just the statblock slicing)")
+    args = parser.parse_args()
+    datapath = args.datapath
+
+    setupLogging(datapath)
+    initWorker(datapath)
+    if setHtmlParser(args.parser) != args.parser:
+        sys.exit(1)
+    entries = loadEntries(datapath)
+
+    statblockFailures = checkStatblockCases()
+    if len(statblockFailures) > 0:
+        print(f"{len(statblockFailures)} of {len(statblock_cases)} test pages have a different statblock sliced out by extractStatblock:")
+        for html in statblockFailures:
+            print("  " + html)
+        sys.exit(1)
+
+    baseline = "html.parser, whole page"
+    candidate = args.parser + ", statblock only"
+    mismatches = []
+    normalizeMismatches = []
+    times = {baseline: 0, candidate: 0}
+    normalizeTimes = {"cleanup passes": 0, "normalizeHtml": 0}
+    for i, url in tqdm(entries):
+        html = readPage(datapath, i, url)
+        statblock = extractStatblock(html)
+        for part in [html] if statblock is None else [html, statblock]:
+            expected, t = normalizeWith(normalizeHtmlReference, part)
+            normalizeTimes["cleanup passes"] += t
+            actual, t = normalizeWith(normalizeHtml, part)
+            normalizeTimes["normalizeHtml"] += t
+            if actual != expected and url not in normalizeMismatches:
+                normalizeMismatches.append(url)
+        expected, t = parseWith(html, url, "html.parser", False)
+        times[baseline] += t
+        actual, t = parseWith(html, url, args.parser, True)
+        times[candidate] += t
+        if actual != expected:
+            mismatches.append(url)
+
+    for name, t in times.items():
+        print(f"{name}: {t:.1f}s ({len(entries) / t:.1f} pages/s)")
+    for name, t in normalizeTimes.items():
+        print(f"{name} (whole pages and statblocks): {t * 1000:.1f}ms")
+    if len(normalizeMismatches) > 0:
+        print(f"{len(normalizeMismatches)} of {len(entries)} pages are cleaned up differently by normalizeHtml:")
+        for url in normalizeMismatches:
+            print("  " + url)
+    if len(mismatches) > 0:
+        print(f"{len(mismatches)} of {len(entries)} pages parse differently with {candidate}:")
+        for url in mismatches:
+            print("  " + url)
+        sys.exit(1)
+    if len(normalizeMismatches) > 0:
+        sys.exit(1)
+    print(f"All {len(entries)} pages parse identically with {candidate}")
@@ -0,0 +1,187 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+
+# A corpus is a single file holding every downloaded page, compressed individually so any one can be read on its own:
+#
+#   header    MAGIC
+#   records   RECORD_MAGIC, url length (u16), data length (u32), url, zlib-compressed html   (repeated)
+#   index     zlib-compressed json of {url: [data offset, data length]}
+#   footer    index offset (u64), index length (u64), MAGIC
+#
+# Records are self-describing, so if the index at the end is missing (e.g. after a crash mid-download) it is rebuilt by scanning them.
+
+MAGIC = b"PFMDCRP1"
+RECORD_MAGIC = b"PGRC"
+RECORD_HEADER = struct.Struct(">4sHI")
+FOOTER = struct.Struct(">QQ8s")
+
+CORPUS_FILENAME = "pages.corpus"
+
+
+def readIndex(fp, size):
+	"""
+	Read the index of an open corpus file
+
+	Returns:
+		tuple: (index, dataEnd), where dataEnd is the offset just past the last record
+	"""
+	fp.seek(0)
+	if fp.read(len(MAGIC)) != MAGIC:
+		raise ValueError("Not a page corpus file: " + fp.name)
+
+	# Normal case: an intact index and footer
+	if size >= len(MAGIC) + FOOTER.size:
+		fp.seek(size - FOOTER.size)
+		indexOffset, indexLength, magic = FOOTER.unpack(fp.read(FOOTER.size))
+		if magic == MAGIC and indexOffset + indexLength + FOOTER.size == size:
+			fp.seek(indexOffset)
+			try:
+				return json.loads(zlib.decompress(fp.read(indexLength))), indexOffset
+			except (zlib.error, ValueError):  # A stale footer left behind by a put() that was never flushed
+				pass
+
+	# Broken or missing footer: rebuild the index from the records, stopping at the first incomplete one
+	index = {}
+	offset = len(MAGIC)
+	while offset + RECORD_HEADER.size <= size:
+		fp.seek(offset)
+		magic, urlLength, dataLength = RECORD_HEADER.unpack(fp.read(RECORD_HEADER.size))
+		dataOffset = offset + RECORD_HEADER.size + urlLength
+		if magic != RECORD_MAGIC or dataOffset + dataLength > size:
+			break
+		url = fp.read(urlLength).decode('utf-8')
+		try:
+			zlib.decompress(fp.read(dataLength))
+		except zlib.error:
+			break
+		index[url] = [dataOffset, dataLength]
+		offset = dataOffset + dataLength
+	return index, offset
+
+
+class CorpusWriter:
+	"""
+	Appends pages to a corpus file, creating it if needed
+
+	Pages are written straight away, but the index is only written on flush() and close().
+	Writing a url that is already present adds a new record and points the index at it.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		if os.path.isfile(path):
+			self.fp = open(path, 'r+b')
+			self.index, self.dataEnd = readIndex(self.fp, os.path.getsize(path))
+		else:
+			self.fp = open(path, 'w+b')
+			self.fp.write(MAGIC)
+			self.index, self.dataEnd = {}, len(MAGIC)
+
+	def __contains__(self, url):
+		return url in self.index
+
+	def put(self, url, html):
+		urlBytes = url.encode('utf-8')
+		data = zlib.compress(html.encode('utf-8'), 9)
+		self.fp.seek(self.dataEnd)
+		self.fp.write(RECORD_HEADER.pack(RECORD_MAGIC, len(urlBytes), len(data)))
+		self.fp.write(urlBytes)
+		self.fp.write(data)
+		self.index[url] = [self.dataEnd + RECORD_HEADER.size + len(urlBytes), len(data)]
+		self.dataEnd += RECORD_HEADER.size + len(urlBytes) + len(data)
+
+	def flush(self):
+		# The index goes after the last record, and is overwritten by the next put()
+		index = zlib.compress(json.dumps(self.index).encode('utf-8'))
+		self.fp.seek(self.dataEnd)
+		self.fp.write(index)
+		self.fp.write(FOOTER.pack(self.dataEnd, len(index), MAGIC))
+		self.fp.truncate()
+		self.fp.flush()
+
+	def close(self):
+		self.flush()
+		self.fp.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+class CorpusReader:
+	"""
+	Random access to the pages of a corpus file by url, through a read-only memory map
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.fp = open(path, 'rb')
+		self.index, _ = readIndex(self.fp, os.path.getsize(path))
+		self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+	def __contains__(self, url):
+		return url in self.index
+
+	def __len__(self):
+		return len(self.index)
+
+	def __iter__(self):
+		return iter(self.index)
+
+	def get(self, url):
+		offset, length = self.index[url]
+		return zlib.decompress(self.mm[offset:offset + length]).decode('utf-8')
+
+	def close(self):
+		self.mm.close()
+		self.fp.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+def pack(datapath):
+	"""
+	Move the loose html files listed in a data folder's manifest into its corpus file, and point the manifest at it
+	"""
+	from download_pages import loadManifest, saveManifest
+
+	manifest = loadManifest(datapath)
+	if manifest is None:
+		print("No manifest.json in " + datapath + ", run download_pages.py first.")
+		return
+
+	packed = []
+	with CorpusWriter(os.path.join(datapath, CORPUS_FILENAME)) as writer:
+		for url, entry in manifest.items():
+			if entry["file"] == CORPUS_FILENAME:
+				continue
+			with open(os.path.join(datapath, entry["file"]), encoding='utf-8') as fp:
+				writer.put(url, fp.read())
+			packed.append(entry["file"])
+			entry["file"] = CORPUS_FILENAME
+
+	# Only remove the loose files once both the corpus and manifest are safely written
+	saveManifest(datapath, manifest)
+	for filename in packed:
+		os.remove(os.path.join(datapath, filename))
+	print(f"Packed {len(packed)} pages into {os.path.join(datapath, CORPUS_FILENAME)}")
+
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1:
+		datapath = sys.argv[1]
+	else:
+		datapath = "data/"
+
+	pack(datapath)
@@ -1,156 +1,280 @@
-import sys
-import json
+import io
+import os
 import csv
-from explore_data import generate_lookups, generate_main_and_counts
-from copy import deepcopy
+import argparse
+import multiprocessing
+from explore_data import load_lookups
+from datafile import loadData
 
 
+# Edit the data a bit
+def edit_monster(pageObject, unique_leaves_counts):
+	if "special_abilities" in pageObject:
+		pageObject["special_abilities"] = [k + ": " + v for k, v in pageObject["special_abilities"].items()]
 
-if __name__ == "__main__":
-	if len(sys.argv) > 1:
-		datapath = sys.argv[1]
-	else:
-		datapath = "data/data.json"
+	if "skills" in pageObject and "_racial_mods" in pageObject["skills"]:
+		pageObject["racial_mods"] = str(pageObject["skills"]["_racial_mods"])
+		del pageObject["skills"]["_racial_mods"]
 
-	print("Loading data...", end="", flush=True)
-	with open(datapath) as f:
-		d = json.load(f)
-	print(" done")
+	if "skills" in pageObject:
+		keys = list(pageObject["skills"].keys())
+		for skill in keys:
+			for cat in pageObject["skills"][skill]:
+				if cat != "_":
+					if not "other" in pageObject["skills"]:
+						pageObject["skills"]["other"] = {}
+					pageObject["skills"]["other"][skill + "_" + cat] = pageObject["skills"][skill][cat]
+			if "_" in pageObject["skills"][skill]:
+				pageObject["skills"][skill] = pageObject["skills"][skill]["_"]
+			else:
+				del pageObject["skills"][skill]
+		if "other" in pageObject["skills"]:
+			pageObject["skills"]["other"] = str(pageObject["skills"]["other"])
 
-	# Filter 3.5 entries
-	# print("Filtering 3.5 entries...", end="", flush=True)
-	# d = {k: v for k, v in d.items() if "is_3.5" not in v}
-	# print(" done")
+	if "senses" in pageObject:
+		keys = list(pageObject["senses"].keys())
+		for sense in keys:
+			if sum(unique_leaves_counts["senses"][sense].values()) > 10:
+				continue
 
-	print("Generating unique_leaves_lookup...", end="", flush=True)
-	unique_leaves_lookup = generate_lookups(d)
-	print(" done")
+			if not "other" in pageObject["senses"]:
+				pageObject["senses"]["other"] = {}
+			pageObject["senses"]["other"][sense] = pageObject["senses"][sense]
+			del pageObject["senses"][sense]
+		if "other" in pageObject["senses"]:
+			pageObject["senses"]["other"] = str(pageObject["senses"]["other"])
 
-	# Use lookups to generate counts and the main dict
-	# Will break on empty dicts or lists, but those really shouldn't be in the data anyway
-	print("Generating unique_leaves and unique_leaves_counts...", end="", flush=True)
-	unique_leaves = deepcopy(unique_leaves_lookup)
-	unique_leaves_counts = deepcopy(unique_leaves_lookup)
-	def generate_main_and_counts(d1, d2):
-		assert type(d1) is dict
+	if "feats" in pageObject:
+		pageObject["feats"] = ", ".join(f["name"] for f in pageObject["feats"])
 
-		# Base case: dict with set values
-		if type(d1[list(d1.keys())[0]]) is set: # Assume d1 and d2 synced
-			return True
+	if "languages" in pageObject:
+		pageObject["languages"] = ", ".join(pageObject["languages"])
 
-		for k in d1:
-			if generate_main_and_counts(d1[k], d2[k]):
-				d1[k] = list(d1[k].keys())
-				d2[k] = {k2: len(v2) for k2, v2 in d2[k].items()}
+	if "immunities" in pageObject:
+		pageObject["immunities"] = ", ".join(pageObject["immunities"])
 
-		return False
+	if "other" in pageObject["initiative"]:
+		pageObject["initiative"]["other"] = str(pageObject["initiative"]["other"])
 
-	generate_main_and_counts(unique_leaves, unique_leaves_counts)
-	print(" done")
+	if "kineticist_wild_talents" in pageObject:
+		pageObject["kineticist_wild_talents"] = str(pageObject["kineticist_wild_talents"])
 
+def getListCounts(d, out, key=""):
+	if type(d) is dict:
+		for k, v in d.items():
+			getListCounts(v, out, key=key + "/" + k)
+	elif type(d) is list or type(d) is set:
+		if not key in out:
+			out[key] = -1
+		out[key] = max(out[key], len(d))
+	else:
+		pass
 
+def flatten(d, listCounts, key=""):
+	out = {}
+	if type(d) is dict:
+		for k, v in d.items():
+			out.update(flatten(v, listCounts, key=key + "/" + k))
+	elif type(d) is list or type(d) is set:
+		if not key in listCounts or listCounts[key] >= 10:
+			out[key] = str(d)
+		else:
+			for i in range(len(d)):
+				out.update(flatten(d[i], listCounts, key=key + "_" + str(i + 1)))
+	else:
+		out[key] = d
+	return out
 
+# The columns flatten would give every monster, which depend on listCounts, so this collects what's needed to work them
+# out once listCounts is known: a merged outline of every monster, with the dicts, lists (by index) and leaves at each key
+def add_shape(d, shape):
+	if type(d) is dict:
+		children = shape.setdefault("dict", {})
+		for k, v in d.items():
+			add_shape(v, children.setdefault(k, {}))
+	elif type(d) is list or type(d) is set:
+		children = shape.setdefault("list", [])
+		for i, v in enumerate(d):
+			if i == len(children):
+				children.append({})
+			add_shape(v, children[i])
+	else:
+		shape["leaf"] = True
 
-	# Edit the data a bit
-	for k in d:
-		if "special_abilities" in d[k]:
-			d[k]["special_abilities"] = [k + ": " + v for k, v in d[k]["special_abilities"].items()]
-
-		if "skills" in d[k] and "_racial_mods" in d[k]["skills"]:
-			d[k]["racial_mods"] = str(d[k]["skills"]["_racial_mods"])
-			del d[k]["skills"]["_racial_mods"]
-
-		if "skills" in d[k]:
-			keys = list(d[k]["skills"].keys())
-			for skill in keys:
-				for cat in d[k]["skills"][skill]:
-					if cat != "_":
-						if not "other" in d[k]["skills"]:
-							d[k]["skills"]["other"] = {}
-						d[k]["skills"]["other"][skill + "_" + cat] = d[k]["skills"][skill][cat]
-				if "_" in d[k]["skills"][skill]:
-					d[k]["skills"][skill] = d[k]["skills"][skill]["_"]
-				else:
-					del d[k]["skills"][skill]
-			if "other" in d[k]["skills"]:
-				d[k]["skills"]["other"] = str(d[k]["skills"]["other"])
-
-		if "senses" in d[k]:
-			keys = list(d[k]["senses"].keys())
-			for sense in keys:
-				if sum(unique_leaves_counts["senses"][sense].values()) > 10:
-					continue
-
-				if not "other" in d[k]["senses"]:
-					d[k]["senses"]["other"] = {}
-				d[k]["senses"]["other"][sense] = d[k]["senses"][sense]
-				del d[k]["senses"][sense]
-			if "other" in d[k]["senses"]:
-				d[k]["senses"]["other"] = str(d[k]["senses"]["other"])
-
-		if "feats" in d[k]:
-			d[k]["feats"] = ", ".join(f["name"] for f in d[k]["feats"])
-
-		if "languages" in d[k]:
-			d[k]["languages"] = ", ".join(d[k]["languages"])
-
-		if "immunities" in d[k]:
-			d[k]["immunities"] = ", ".join(d[k]["immunities"])
-
-		if "other" in d[k]["initiative"]:
-			d[k]["initiative"]["other"] = str(d[k]["initiative"]["other"])
-
-		if "kineticist_wild_talents" in d[k]:
-			d[k]["kineticist_wild_talents"] = str(d[k]["kineticist_wild_talents"])
-
-	def getListCounts(d, out, key=""):
-		if type(d) is dict:
-			for k, v in d.items():
-				getListCounts(v, out, key=key + "/" + k)
-		elif type(d) is list or type(d) is set:
-			if not key in out:
-				out[key] = -1
-			out[key] = max(out[key], len(d))
+def shape_columns(shape, listCounts, out, key=""):
+	if "leaf" in shape:
+		out.add(key)
+	for k, v in shape.get("dict", {}).items():
+		shape_columns(v, listCounts, out, key=key + "/" + k)
+	if "list" in shape:
+		if not key in listCounts or listCounts[key] >= 10:
+			out.add(key)
 		else:
-			pass
-
-	def flatten(d, listCounts, key=""):
-		out = {}
-		if type(d) is dict:
-			for k, v in d.items():
-				out.update(flatten(v, listCounts, key=key + "/" + k))
-		elif type(d) is list or type(d) is set:
+			for i, v in enumerate(shape["list"]):
+				shape_columns(v, listCounts, out, key=key + "_" + str(i + 1))
+	return out
+
+# A faster flatten for a known set of columns. This generates the source of a function that walks the outline of every
+# monster, fetching each key directly and writing each leaf into its column's slot of a preallocated row, without
+# building and merging a dict per level. columns maps each of flatten's keys to its index in the row.
+# Collisions aside (two paths flattening to the same key), the row holds the same values flatten gives, with None for
+# missing columns.
+def compile_flattener(shape, listCounts, columns):
+	lines = ["def extract(v0, row):"]
+	names = [0]
+
+	def new_name(prefix):
+		names[0] += 1
+		return prefix + str(names[0])
+
+	def emit(shape, var, key, indent):
+		if set(shape) == {"leaf"}:
+			lines.append(indent + f"row[{columns[key]}] = {var}")
+			return
+		t = new_name("t")
+		lines.append(indent + f"{t} = type({var})")
+		branch = "if"
+		if "dict" in shape:
+			lines.append(indent + f"{branch} {t} is dict:")
+			for k, child in shape["dict"].items():
+				x = new_name("v")
+				lines.append(indent + f"\t{x} = {var}.get({k!r}, MISSING)")
+				lines.append(indent + f"\tif {x} is not MISSING:")
+				emit(child, x, key + "/" + k, indent + "\t\t")
+			lines.append(indent + "\tpass")
+			branch = "elif"
+		if "list" in shape:
+			lines.append(indent + f"{branch} {t} is list or {t} is set:")
 			if not key in listCounts or listCounts[key] >= 10:
-				out[key] = str(d)
+				lines.append(indent + f"\trow[{columns[key]}] = str({var})")
 			else:
-				for i in range(len(d)):
-					out.update(flatten(d[i], listCounts, key=key + "_" + str(i + 1)))
-		else:
-			out[key] = d
-		return out
+				lines.append(indent + f"\tn = len({var})")
+				for i, child in enumerate(shape["list"]):
+					x = new_name("v")
+					lines.append(indent + f"\tif n > {i}:")
+					lines.append(indent + f"\t\t{x} = {var}[{i}]")
+					emit(child, x, key + "_" + str(i + 1), indent + "\t\t")
+				lines.append(indent + "\tpass")
+			branch = "elif"
+		if "leaf" in shape:
+			lines.append(indent + "else:")
+			lines.append(indent + f"\trow[{columns[key]}] = {var}")
+
+	emit(shape, "v0", "", "\t")
+	namespace = {"MISSING": object()}
+	exec(compile("\n".join(lines), "<flattener>", "exec"), namespace)
+	return namespace["extract"]
+
 
-	print("Generating csv...", end="", flush=True)
+# Worker state for --jobs mode. Each process (or the main process, in a serial run) reads the monsters in its chunks
+# from data.json itself, so only urls, the merged first pass results and finished csv text go between processes
+def init_worker(datapath, unique_leaves_counts, shape=None, listCounts=None, keys=None):
+	global worker_d, worker_counts, worker_extract, worker_url_column, worker_columns
+	worker_d = loadData(datapath, cache=False)
+	worker_counts = unique_leaves_counts
+	if keys is not None: # Second pass
+		worker_extract = compile_flattener(shape, listCounts, {"/" + k: i for i, k in enumerate(keys)})
+		worker_url_column = keys.index("URL")
+		worker_columns = len(keys)
+
+# First pass over a chunk of urls: their list lengths, outline and titles
+def scan_chunk(urls):
 	listCounts = {}
-	for v in d.values():
-		getListCounts(v, listCounts)
-	l = []
-	for k in d:
-		row = flatten(d[k], listCounts)
-		row = {k[1:]: v for k, v in row.items()} # Strip starting slash
-		row["URL"] = k
-		l.append(row)
+	shape = {}
+	titles = []
+	for k in urls:
+		pageObject = worker_d[k]
+		edit_monster(pageObject, worker_counts)
+		getListCounts(pageObject, listCounts)
+		add_shape(pageObject, shape)
+		titles.append((pageObject["title2"], k))
+	return listCounts, shape, titles
+
+# Second pass over a chunk of urls: their rows, as csv text
+def write_chunk(urls):
+	out = io.StringIO()
+	writer = csv.writer(out)
+	for k in urls:
+		pageObject = worker_d[k]
+		edit_monster(pageObject, worker_counts)
+		row = [None] * worker_columns
+		worker_extract(pageObject, row)
+		row[worker_url_column] = k
+		writer.writerow(row)
+	return out.getvalue()
+
+def merge_shape(shape, other):
+	if "leaf" in other:
+		shape["leaf"] = True
+	if "dict" in other: # Even an empty one, which marks where a monster has an empty dict
+		children = shape.setdefault("dict", {})
+		for k, v in other["dict"].items():
+			merge_shape(children.setdefault(k, {}), v)
+	if "list" in other:
+		children = shape.setdefault("list", [])
+		for i, v in enumerate(other["list"]):
+			if i == len(children):
+				children.append({})
+			merge_shape(children[i], v)
+
+def chunks(l, size):
+	return [l[i:i + size] for i in range(0, len(l), size)]
+
+# Run f over the chunks, in worker processes if there's more than one job, giving results in chunk order either way
+def map_chunks(f, l, jobs, initargs):
+	if jobs > 1 and len(l) > 1:
+		with multiprocessing.Pool(jobs, initializer=init_worker, initargs=initargs) as pool:
+			yield from pool.imap(f, l) # imap keeps results in chunk order, so the output matches a serial run
+	else:
+		init_worker(*initargs)
+		yield from map(f, l)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Flatten the database into data/output.csv.")
+	parser.add_argument("datapath", nargs="?", default="data/data.json", help="the database to convert (default data/data.json)")
+	parser.add_argument("--jobs", "-j", type=int, default=1, help="number of worker processes to flatten with (default 1, 0 for one per CPU)")
+	args = parser.parse_args()
+	datapath = args.datapath
+	jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+
+	# Monsters aren't kept once decoded, so memory stays flat: each pass reads them from data.json again
+	print("Loading data...", end="", flush=True)
+	d = loadData(datapath, cache=False)
 	print(" done")
 
-	l = sorted(l, key=lambda row: row["title2"])
+	# Filter 3.5 entries
+	# print("Filtering 3.5 entries...", end="", flush=True)
+	# d = {k: v for k, v in d.items() if "is_3.5" not in v}
+	# print(" done")
 
-	print("Writing csv...", end="", flush=True)
-	a_file = open("data/output.csv", "w")
-	keys = sorted(list(set().union(*[set(d.keys()) for d in l])))
+	unique_leaves_lookup, unique_leaves, unique_leaves_counts = load_lookups(datapath, d)
+
+	# First pass: work out the list lengths, columns and row order
+	print("Generating csv columns...", end="", flush=True)
+	listCounts = {}
+	shape = {}
+	titles = []
+	for chunkListCounts, chunkShape, chunkTitles in map_chunks(scan_chunk, chunks(list(d), 100), jobs, (datapath, unique_leaves_counts)):
+		for k, v in chunkListCounts.items():
+			listCounts[k] = max(listCounts.get(k, -1), v)
+		merge_shape(shape, chunkShape)
+		titles += chunkTitles
+	columns = shape_columns(shape, listCounts, set())
+	print(" done")
+
+	keys = sorted(list(set(k[1:] for k in columns) | {"URL"})) # Strip starting slash
 	manual_first_keys = ["title2", "CR", "type", "URL"]
 	for i in range(len(manual_first_keys)):
 		keys.pop(keys.index(manual_first_keys[i]))
 	keys = manual_first_keys + keys
-	dict_writer = csv.DictWriter(a_file, keys)
-	dict_writer.writeheader()
-	dict_writer.writerows(l)
-	print(" done")
\ No newline at end of file
+
+	# Second pass: write the rows straight to the file, sorted by title2
+	print("Writing csv...", end="", flush=True)
+	order = [k for _, k in sorted(titles, key=lambda x: x[0])]
+	a_file = open("data/output.csv", "w")
+	csv.writer(a_file).writerow(keys)
+	for text in map_chunks(write_chunk, chunks(order, 100), jobs, (datapath, unique_leaves_counts, shape, listCounts, keys)):
+		a_file.write(text)
+	a_file.close()
+	print(" done")
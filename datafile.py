@@ -0,0 +1,214 @@
+import json
+import os
+from collections.abc import MutableMapping
+
+
+# main.py streams the database to data.ndjson as it parses, one monster per line, each line a single-entry {url: pageObject}
+# object. Since json.dumps writes those lines exactly as json.dump writes the entries of the full dict, data.json can be
+# built from them by plain string joining, without decoding anything or holding the whole database in memory.
+
+NDJSON_FILENAME = "data.ndjson"
+JSON_FILENAME = "data.json"
+INDEX_SUFFIX = ".index"  # data.json.index maps each url to the byte range of its monster in data.json, see loadData
+
+
+class NdjsonWriter:
+    """
+    Writes monsters to an NDJSON file as they're parsed
+
+    The file is line buffered, so after a crash it holds every monster written before it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.fp = open(path, 'w', buffering=1)
+
+    def write(self, url, pageObject):
+        self.fp.write(json.dumps({url: pageObject}) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def iterNdjson(path):
+    """
+    Read the monsters in an NDJSON file one at a time
+
+    Returns:
+        generator: (url, pageObject) pairs, in file order
+    """
+    with open(path) as fp:
+        for line in fp:
+            if line.strip() == "":
+                continue
+            yield next(iter(json.loads(line).items()))
+
+def buildDataJson(ndjsonPath, jsonPath):
+    """
+    Build the legacy data.json from an NDJSON file, byte for byte the same as json.dump of the full dict
+
+    Since we know where each monster lands as we write it, this also writes the offset index loadData uses.
+    """
+    entries = []
+    offset = 1
+    with open(ndjsonPath) as src, open(jsonPath + ".tmp", 'w') as fp:
+        fp.write("{")
+        first = True
+        for line in src:
+            line = line.rstrip("\n")
+            if line == "":
+                continue
+            if not first:
+                fp.write(", ")
+                offset += 2
+            first = False
+            entry = line[1:-1]  # Strip the braces of the single-entry object
+            fp.write(entry)
+            if entries is not None:
+                if entry.isascii():  # Character and byte offsets only line up for ascii, which json.dumps always writes
+                    url, end = json.decoder.scanstring(entry, 1)
+                    entries.append([url, offset + end + 2, offset + len(entry)])  # The value starts after the ": "
+                else:
+                    entries = None
+            offset += len(entry)
+        fp.write("}")
+    os.replace(jsonPath + ".tmp", jsonPath)
+    if entries is not None:
+        saveIndex(jsonPath, entries)
+
+
+def saveIndex(jsonPath, entries):
+    # The index records the size and modification time of the data.json it was built from, so it's rebuilt if that changes
+    stat = os.stat(jsonPath)
+    try:
+        with open(jsonPath + INDEX_SUFFIX + ".tmp", 'w') as fp:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "entries": entries}, fp)
+        os.replace(jsonPath + INDEX_SUFFIX + ".tmp", jsonPath + INDEX_SUFFIX)
+    except OSError:  # E.g. a read-only data folder. The index is just rebuilt next time
+        pass
+
+def loadIndex(jsonPath):
+    """
+    Returns:
+        list: The [url, start, end] entries of the index of a data.json, or None if there is no index or it's out of date
+    """
+    try:
+        with open(jsonPath + INDEX_SUFFIX) as fp:
+            index = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(jsonPath)
+    if index.get("size") != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return index["entries"]
+
+def buildIndex(jsonPath):
+    """
+    Find the byte range of every monster in a data.json, for when there's no up to date index
+
+    This decodes each monster once to find where it ends (but only keeps one at a time), so it takes about as long as json.load.
+
+    Returns:
+        list: [url, start, end] entries, in file order
+    """
+    with open(jsonPath, 'rb') as fp:
+        data = fp.read()
+    text = data.decode('utf-8')
+    ascii = text.isascii()
+    decoder = json.JSONDecoder()
+    whitespace = json.decoder.WHITESPACE
+
+    def byteOffset(pos):
+        return pos if ascii else len(text[:pos].encode('utf-8'))
+
+    entries = []
+    pos = whitespace.match(text, 0).end()
+    if text[pos] != "{":
+        raise ValueError(jsonPath + " doesn't hold a json object")
+    pos = whitespace.match(text, pos + 1).end()
+    if text[pos] == "}":
+        return entries
+    while True:
+        url, pos = json.decoder.scanstring(text, pos + 1)  # Skip the opening quote
+        pos = whitespace.match(text, pos).end() + 1  # Skip the colon
+        start = whitespace.match(text, pos).end()
+        _, pos = decoder.raw_decode(text, start)
+        entries.append([url, byteOffset(start), byteOffset(pos)])
+        pos = whitespace.match(text, pos).end()
+        if text[pos] == "}":
+            return entries
+        pos = whitespace.match(text, pos + 1).end()  # Skip the comma
+
+
+class LazyData(MutableMapping):
+    """
+    The database as a dict of url to monster, where each monster is only read from data.json and decoded when first accessed
+
+    Monsters stay decoded once accessed, so changes made to them stick, and monsters can be added, replaced and removed
+    as in a normal dict. Iteration follows the order of data.json.
+
+    With cache=False, monsters are decoded again on every access instead, so memory doesn't grow as they're read (but
+    changes to them are lost). Monsters that were set or added are still kept.
+    """
+
+    def __init__(self, jsonPath, entries, cache=True):
+        self.path = jsonPath
+        self.ranges = {url: (start, end) for url, start, end in entries}  # None for monsters added since loading
+        self.decoded = {}
+        self.cache = cache
+        self.fp = None
+
+    def __getitem__(self, url):
+        if url in self.decoded:
+            return self.decoded[url]
+        start, end = self.ranges[url]
+        if self.fp is None:
+            self.fp = open(self.path, 'rb')
+        self.fp.seek(start)
+        pageObject = json.loads(self.fp.read(end - start))
+        if self.cache:
+            self.decoded[url] = pageObject
+        return pageObject
+
+    def __setitem__(self, url, pageObject):
+        if url not in self.ranges:
+            self.ranges[url] = None
+        self.decoded[url] = pageObject
+
+    def __delitem__(self, url):
+        del self.ranges[url]
+        self.decoded.pop(url, None)
+
+    def __contains__(self, url):
+        return url in self.ranges
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __repr__(self):
+        return f"<LazyData of {self.path}: {len(self.ranges)} monsters, {len(self.decoded)} decoded>"
+
+
+def loadData(jsonPath, cache=True):
+    """
+    Open a data.json as a LazyData, using its offset index if it has an up to date one and building it otherwise
+
+    Returns:
+        LazyData: The database
+    """
+    entries = loadIndex(jsonPath)
+    if entries is None:
+        entries = buildIndex(jsonPath)
+        saveIndex(jsonPath, entries)
+    return LazyData(jsonPath, entries, cache)
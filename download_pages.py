@@ -1,31 +1,138 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import sys
 import traceback
+import threading
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 import os
 from pathlib import Path
+from corpus import CorpusReader, CorpusWriter, CORPUS_FILENAME
 
 
 MAX_REQUESTS_PER_SECOND = 20
+MAX_WORKERS = 8  # Requests in flight at once, so per-request latency doesn't eat into the rate limit
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1  # Seconds before the first retry, doubled on each subsequent one
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+TIMEOUT = 30
+MANIFEST_SAVE_EVERY = 50  # Pages between manifest checkpoints, so a crash loses at most this much progress
+
+
+class TokenBucket:
+	"""
+	A thread-safe token bucket rate limiter
+
+	Allows `rate` acquisitions per second on average, with bursts of up to `capacity`.
+	"""
+
+	def __init__(self, rate, capacity=1):
+		self.rate = rate
+		self.capacity = capacity
+		self.tokens = capacity
+		self.last = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+				self.last = now
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				wait = (1 - self.tokens) / self.rate
+			time.sleep(wait)
+
+
+def makeSession(poolSize):
+	# One shared session so connections are kept alive and reused across requests
+	session = requests.Session()
+	adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize)
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+
+# The manifest maps each url to its downloaded file, along with what we need to revalidate it later:
+# {url: {"file": ..., "sha256": ..., "etag": ..., "last_modified": ..., "fetched": ...}}
+def pageFilename(url):
+	# Named after the url rather than its position in the list, so adding or removing urls doesn't shift every file
+	return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + ".html"
+
+def loadManifest(outdir):
+	path = os.path.join(outdir, "manifest.json")
+	if not os.path.isfile(path):
+		return None
+	with open(path, encoding='utf-8') as fp:
+		return json.load(fp)
+
+def saveManifest(outdir, manifest):
+	# Write to a temporary file first so a crash mid-write can't corrupt the existing manifest
+	path = os.path.join(outdir, "manifest.json")
+	with open(path + ".tmp", 'w', encoding='utf-8') as fp:
+		json.dump(manifest, fp, indent=1, sort_keys=True)
+	os.replace(path + ".tmp", path)
+
+
+def fetch(session, bucket, url, headers=None):
+	"""
+	Download a page, retrying transient failures (connection errors, timeouts, 429 and 5xx responses) with exponential backoff
+
+	Every attempt, retries included, takes a token from the bucket.
+	Returns the response, which may be a 304 if conditional headers were given.
+	Raises an HTTPError straight away for any other error status, and the last error if the page still can't be fetched
+	after MAX_RETRIES retries.
+	"""
+	for attempt in range(MAX_RETRIES + 1):
+		bucket.acquire()
+		try:
+			response = session.get(url, headers=headers, timeout=TIMEOUT)
+		except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+			if attempt == MAX_RETRIES:
+				raise
+		else:
+			if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+				response.raise_for_status()  # Other errors, like a 404, won't go away by retrying
+				return response
+		time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def isDownloaded(outdir, url, entry, corpus):
+	if entry["file"] == CORPUS_FILENAME:
+		return corpus is not None and url in corpus
+	return os.path.isfile(os.path.join(outdir, entry["file"]))
+
+def conditionalHeaders(entry):
+	headers = {}
+	if entry.get("etag") is not None:
+		headers["If-None-Match"] = entry["etag"]
+	if entry.get("last_modified") is not None:
+		headers["If-Modified-Since"] = entry["last_modified"]
+	return headers
 
 
 if __name__ == "__main__":
-	if len(sys.argv) > 1:
-		urllistpath = sys.argv[1]
-	else:
-		urllistpath = "data/urls.txt"
-	if len(sys.argv) > 2:
-		outdir = sys.argv[2]
-	else:
-		outdir = "data/"
+	parser = argparse.ArgumentParser(description="Download every monster page in the url list.")
+	parser.add_argument("urllistpath", nargs="?", default="data/urls.txt", help="file with one url per line")
+	parser.add_argument("outdir", nargs="?", default="data/", help="folder to write the pages and manifest.json to")
+	parser.add_argument("--refresh", action="store_true", help="revalidate already-downloaded pages with conditional requests instead of skipping them")
+	parser.add_argument("--corpus", action="store_true", help="store pages in a single compressed " + CORPUS_FILENAME + " file instead of one html file each")
+	args = parser.parse_args()
+	urllistpath = args.urllistpath
+	outdir = args.outdir
 
 
 	urls = []
 	with open(urllistpath) as file:
 		for line in file:
 			urls.append(line.rstrip())
-	
+
 	# Remove duplicates and sort
 	urls = sorted(list(set(urls)))
 
@@ -37,20 +144,72 @@ if __name__ == "__main__":
 		with open(os.path.join(outdir, "urls.txt"), 'w') as fp:
 			fp.write("\n".join(urls))
 
-	for i, url in enumerate(tqdm(urls)):
-		t = time.time()
-		try:
-			html = requests.get(url).text
-		except requests.exceptions.RequestException as e:
-			print(url)
-			_, _, tb = sys.exc_info()
-			traceback.print_tb(tb)
-			print(type(e).__name__ + ": " + str(e))
-		tSpent = time.time() - t
-
-		with open(os.path.join(outdir, str(i) + '.html'), 'w', encoding='utf-8') as fp:
-			fp.write(html)
-
-		# Avoid getting rate limited
-		if tSpent < 1 / MAX_REQUESTS_PER_SECOND:
-			time.sleep(1 / MAX_REQUESTS_PER_SECOND - tSpent)
\ No newline at end of file
+	manifest = loadManifest(outdir) or {}
+
+	corpusPath = os.path.join(outdir, CORPUS_FILENAME)
+	if args.corpus:
+		corpus = CorpusWriter(corpusPath)
+	elif os.path.isfile(corpusPath):  # Pages packed by an earlier run still count as downloaded
+		corpus = CorpusReader(corpusPath)
+	else:
+		corpus = None
+
+	# Pages already on disk are skipped (or revalidated with --refresh), so an interrupted run picks up where it left off
+	jobs = []
+	for url in urls:
+		entry = manifest.get(url)
+		if entry is not None and isDownloaded(outdir, url, entry, corpus):
+			if args.refresh:
+				jobs.append((url, conditionalHeaders(entry)))
+		else:
+			jobs.append((url, None))
+	if args.refresh:
+		print(f"Revalidating {sum(headers is not None for _, headers in jobs)} downloaded pages, fetching {sum(headers is None for _, headers in jobs)} new ones")
+	else:
+		print(f"{len(urls) - len(jobs)} pages already downloaded, fetching {len(jobs)}")
+
+	session = makeSession(MAX_WORKERS)
+	bucket = TokenBucket(MAX_REQUESTS_PER_SECOND)  # Avoid getting rate limited
+	executor = ThreadPoolExecutor(MAX_WORKERS)
+	try:
+		futures = {executor.submit(fetch, session, bucket, url, headers): url for url, headers in jobs}
+		for n, future in enumerate(tqdm(as_completed(futures), total=len(futures))):
+			url = futures[future]
+			try:
+				response = future.result()
+			except requests.exceptions.RequestException as e:
+				print(url)
+				traceback.print_tb(e.__traceback__)
+				print(type(e).__name__ + ": " + str(e))
+				continue
+
+			fetched = datetime.now(timezone.utc).isoformat(timespec='seconds')
+			if response.status_code == 304:  # Unchanged since we last downloaded it
+				manifest[url]["fetched"] = fetched
+			else:
+				html = response.text
+				if args.corpus:
+					filename = CORPUS_FILENAME
+					corpus.put(url, html)
+				else:
+					filename = pageFilename(url)
+					with open(os.path.join(outdir, filename), 'w', encoding='utf-8') as fp:
+						fp.write(html)
+				manifest[url] = {
+					"file": filename,
+					"sha256": hashlib.sha256(html.encode('utf-8')).hexdigest(),
+					"etag": response.headers.get("ETag"),
+					"last_modified": response.headers.get("Last-Modified"),
+					"fetched": fetched
+				}
+
+			if n % MANIFEST_SAVE_EVERY == 0:
+				if args.corpus:
+					corpus.flush()
+				saveManifest(outdir, manifest)
+	finally:
+		# On a crash or Ctrl-C, drop the queued requests and record everything finished so far
+		executor.shutdown(wait=False, cancel_futures=True)
+		if corpus is not None:
+			corpus.close()
+		saveManifest(outdir, manifest)
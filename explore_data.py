@@ -1,9 +1,14 @@
+import os
 import sys
 import json
-from copy import deepcopy
+from collections.abc import Mapping, MutableMapping
 import regex as re
 from pprint import pprint # Alternative printing option that sorts dicts
 
+from datafile import loadData
+from leaf_index import LeafIndex
+from query import Query
+
 
 # For nice printing
 def sort_lists(item):
@@ -14,7 +19,7 @@ def sort_lists(item):
 			return sorted(sort_lists(i) for i in item)
 		except TypeError: # This handles cases like a list of dicts, where the dicts can't be compared against each other to sort them
 			return [sort_lists(i) for i in item]
-	elif isinstance(item, dict):
+	elif isinstance(item, Mapping): # Includes the lazily loaded database
 		return {k: sort_lists(v) for k, v in item.items()}
 	else:
 		return item
@@ -26,7 +31,7 @@ def p(d):
 
 # For searching a nested dict for stuff
 def search(d, s, caseSensitive=True, regex=False):
-	if type(d) is dict:
+	if isinstance(d, Mapping):
 		out = {}
 		for k, v in d.items():
 			t = search(v, s, caseSensitive=caseSensitive, regex=regex)
@@ -62,6 +67,95 @@ def search(d, s, caseSensitive=True, regex=False):
 		if d == s:
 			return d
 
+# For searching the text of spells, spell-like abilities, special abilities and descriptions (see leaf_index.TEXT_FIELDS)
+# using the full-text index, which is built the first time it's needed. Matches whole words, case-insensitively:
+# by default s has to appear as a phrase, and with phrase=False its words just have to all be in the same string.
+# Returns the same shape as search(d, s), with the monsters with the best matches first.
+def text_search(d, s, phrase=True, caseSensitive=False, leaf_index=None):
+	leaf_index = leaf_index_for(d, leaf_index)
+	if not leaf_index.hasText():
+		print("Building the text index...", end="", flush=True)
+		leaf_index.storeText(indexed_data(d, leaf_index))
+		print(" done")
+
+	words = re.findall(r'\w+', s)
+	if len(words) == 0:
+		return None
+	if phrase:
+		query = '"' + " ".join(words) + '"'
+	else:
+		query = " AND ".join('"' + w + '"' for w in words)
+
+	matched = {}
+	for url, path, is_key, text in leaf_index.searchText(query):
+		if url not in d: # Filtered out of d
+			continue
+		if caseSensitive and not (s in text if phrase else all(w in text for w in words)):
+			continue
+		matched.setdefault(url, set()).add((tuple(path), is_key))
+	out = {}
+	for url, paths in matched.items():
+		out[url] = select_matches(d[url], paths)
+	if len(out) > 0:
+		return out
+
+# For finding monsters by the values of their fields, e.g. query(d, "CR >= 10, speeds/fly >= 60, type = outsider, has SR")
+# (see query.py for the syntax). Returns the matching urls, answered from the leaf index, which is built if it's out of date.
+# explain_query shows which indexes each condition used and how many monsters it left.
+def query(d, s, leaf_index=None):
+	return [url for url in Query(s).run(current_leaf_index(d, leaf_index)) if url in d]
+
+def explain_query(d, s, leaf_index=None):
+	leaf_index = current_leaf_index(d, leaf_index)
+	q = Query(s)
+	print(q.explain(leaf_index))
+	if not hasattr(d, "path"):
+		print(f"{sum(url in d for url in q.run(leaf_index))} of them in d")
+
+def current_leaf_index(d, leaf_index=None):
+	leaf_index = leaf_index_for(d, leaf_index)
+	if not leaf_index.isCurrent():
+		load_lookups(leaf_index.jsonPath, indexed_data(d, leaf_index), leaf_index)
+	return leaf_index
+
+# The leaf index of the data.json d was loaded from. A filtered d is a plain dict, which doesn't know where it came from,
+# so the index has to be passed in (in the interactive session, leaf_index=leaf_index)
+def leaf_index_for(d, leaf_index=None):
+	if leaf_index is not None:
+		return leaf_index
+	if not hasattr(d, "path"):
+		raise ValueError("d wasn't loaded straight from a data.json (was it filtered?), so pass the leaf index of the data.json it came from, e.g. leaf_index=LeafIndex(\"data/data.json\")")
+	return LeafIndex(d.path)
+
+# The whole database the leaf index is for, which a filtered d isn't
+def indexed_data(d, leaf_index):
+	if hasattr(d, "path") and os.path.abspath(d.path) == os.path.abspath(leaf_index.jsonPath):
+		return d
+	return loadData(leaf_index.jsonPath)
+
+# Pick out the strings at the given (path, is_key) pairs, nested the same way search does
+def select_matches(d, paths, path=()):
+	if type(d) is dict:
+		out = {}
+		for k, v in d.items():
+			t = select_matches(v, paths, path + (k,))
+			if t:
+				out[k] = t
+			elif (path + (k,), True) in paths:
+				out[k] = k
+		if len(out) > 0:
+			return out
+	elif type(d) is list:
+		out = []
+		for i, d2 in enumerate(d):
+			t = select_matches(d2, paths, path + (i,))
+			if t:
+				out.append(t)
+		if len(out) > 0:
+			return out
+	elif (path, False) in paths:
+		return d
+
 
 def join_nested_dicts_of_sets(l): # l is a list of nested dicts, where all leaves are sets
 	if len(l) == 0:
@@ -74,30 +168,90 @@ def join_nested_dicts_of_sets(l): # l is a list of nested dicts, where all leave
 		d1[k] = join_nested_dicts_of_sets([d2[k] for d2 in l if k in d2])
 	return d1
 
-def generate_lookups(d, url=None): # url param is for internal use and should not be set by the caller
-	if url is None: # We're at the top
-		return join_nested_dicts_of_sets([generate_lookups(v, url=k) for k, v in d.items()])
+# Walks each monster once, adding its url straight into the lookup at the path of each of its leaves
+def generate_lookups(d):
+	lookup = {}
+	for url, v in d.items():
+		add_to_lookups(v, url, lookup)
+	return lookup
 
+def add_to_lookups(d, url, node): # node is the part of the lookup that d's leaves go under
 	if type(d) is dict:
-		return {k: generate_lookups(v, url=url) for k, v in d.items()}
-	elif type(d) is list or type(d) is set:
-		return join_nested_dicts_of_sets([generate_lookups(x, url=url) for x in d])
+		for k, v in d.items():
+			add_to_lookups(v, url, node.setdefault(k, {}))
+	elif type(d) is list or type(d) is set: # List elements all go under the list's own path
+		for x in d:
+			add_to_lookups(x, url, node)
 	else:
-		return {d: set([url])}
+		urls = node.get(d)
+		if urls is None:
+			node[d] = {url}
+		else:
+			urls.add(url)
+
+# Generates unique_leaves_lookup, unique_leaves and unique_leaves_counts, building the other two from the lookup
+# without copying it
+def generate_all_lookups(d):
+	lookup = generate_lookups(d)
+	main, counts = generate_main_and_counts(lookup)
+	return lookup, main, counts
+
+# A dict that's only computed the first time it's used, so the interactive session starts without waiting for it
+class DeferredDict(MutableMapping):
+	def __init__(self, build):
+		self.build = build
+		self.data = None
+
+	def resolve(self):
+		if self.data is None:
+			self.data = self.build()
+		return self.data
 
-def generate_main_and_counts(d1, d2):
-	assert type(d1) is dict
+	def __getitem__(self, k):
+		return self.resolve()[k]
+	def __setitem__(self, k, v):
+		self.resolve()[k] = v
+	def __delitem__(self, k):
+		del self.resolve()[k]
+	def __iter__(self):
+		return iter(self.resolve())
+	def __len__(self):
+		return len(self.resolve())
+	def __repr__(self):
+		return repr(self.resolve())
 
-	# Base case: dict with set values
-	if type(d1[list(d1.keys())[0]]) is set: # Assume d1 and d2 synced
-		return True
+# A node of the lookup that holds any sets of urls is a leaf node: it becomes the list of its keys in unique_leaves, and
+# a dict of each key's number of urls in unique_leaves_counts (the number of keys, for any that hold dicts, since paths
+# can end in a leaf for some monsters and go on for others). Other nodes are recursed into
+def generate_main_and_counts(lookup):
+	main, counts = {}, {}
+	for k, v in lookup.items():
+		if any(type(v2) is set for v2 in v.values()):
+			main[k] = list(v.keys())
+			counts[k] = {k2: len(v2) for k2, v2 in v.items()}
+		else:
+			main[k], counts[k] = generate_main_and_counts(v)
+	return main, counts
+
+# Get unique_leaves_lookup, unique_leaves and unique_leaves_counts for the database d loaded from datapath,
+# from the leaf index if it's up to date, otherwise generating them and saving them to the index
+def load_lookups(datapath, d, leaf_index=None):
+	if leaf_index is None:
+		leaf_index = LeafIndex(datapath)
+	if leaf_index.isCurrent():
+		print("Loading unique leaves from the leaf index...", end="", flush=True)
+		out = tuple(leaf_index.load(name) for name in ["unique_leaves_lookup", "unique_leaves", "unique_leaves_counts"])
+		print(" done")
+		return out
 
-	for k in d1:
-		if generate_main_and_counts(d1[k], d2[k]):
-			d1[k] = list(d1[k].keys())
-			d2[k] = {k2: len(v2) for k2, v2 in d2[k].items()}
+	print("Generating unique_leaves_lookup, unique_leaves and unique_leaves_counts...", end="", flush=True)
+	unique_leaves_lookup, unique_leaves, unique_leaves_counts = generate_all_lookups(d)
+	print(" done")
 
-	return False
+	print("Saving the leaf index...", end="", flush=True)
+	leaf_index.store(unique_leaves_lookup, unique_leaves, unique_leaves_counts)
+	print(" done")
+	return unique_leaves_lookup, unique_leaves, unique_leaves_counts
 
 
 if __name__ == "__main__":
@@ -106,34 +260,25 @@ if __name__ == "__main__":
 	else:
 		datapath = "data/data.json"
 
+	# Monsters are only decoded from data.json when first accessed, see datafile.loadData
 	print("Loading data...", end="", flush=True)
-	with open(datapath) as f:
-		d = json.load(f)
+	d = loadData(datapath)
 	print(" done")
 
 	# Filter 3.5 entries
+	# The leaf index is for the whole of data.json, so if you filter, generate the lookups from d instead of using load_lookups,
+	# and pass leaf_index=leaf_index to text_search and query, which then only return monsters that are still in d
 	# print("Filtering 3.5 entries...", end="", flush=True)
 	# d = {k: v for k, v in d.items() if "is_3.5" not in v}
 	# print(" done")
 
-	print("Generating unique_leaves_lookup...", end="", flush=True)
-	unique_leaves_lookup = generate_lookups(d)
-	print(" done")
-
-	# Use lookups to generate counts and the main dict
-	# Will break on empty dicts or lists, but those really shouldn't be in the data anyway
-	print("Generating unique_leaves and unique_leaves_counts...", end="", flush=True)
-	unique_leaves = deepcopy(unique_leaves_lookup)
-	unique_leaves_counts = deepcopy(unique_leaves_lookup)
-
-	generate_main_and_counts(unique_leaves, unique_leaves_counts)
-	print(" done")
-
-
-
-
-
-
-
-
-
+	# The lookups are loaded (or generated) the first time one of them is used. leaf_index can also answer
+	# queries about a single path, like leaf_index.counts("speeds/fly"), without loading them at all
+	leaf_index = LeafIndex(datapath)
+	def build_lookups(which):
+		if unique_leaves_lookup.data is None: # The three are loaded together
+			unique_leaves_lookup.data, unique_leaves.data, unique_leaves_counts.data = load_lookups(datapath, d, leaf_index)
+		return which.data
+	unique_leaves_lookup = DeferredDict(lambda: build_lookups(unique_leaves_lookup))
+	unique_leaves = DeferredDict(lambda: build_lookups(unique_leaves))
+	unique_leaves_counts = DeferredDict(lambda: build_lookups(unique_leaves_counts))
@@ -0,0 +1,128 @@
+import os
+import sys
+import struct
+import argparse
+from array import array
+
+from datafile import loadData
+
+
+# Exports the numeric statblock fields of every monster as columns, one value per monster in data.json order, so they
+# can be analysed with numpy, pandas, polars and so on without walking the nested dicts. A field a monster doesn't
+# have (or that isn't a number, like a CR of "-") is null.
+#
+#   npy       a folder of .npy files, one per column plus urls.npy. Needs nothing installed. Every column is float64,
+#             with NaN for nulls
+#   parquet   a single Parquet file. Needs pyarrow. Columns are int64 if every value is a whole number, float64 otherwise
+#   arrow     a single Arrow IPC (Feather) file. Needs pyarrow, with the same column types as parquet
+
+# Fixed columns, as paths into a monster
+fixed_columns = [
+    ["CR"], ["XP"], ["HP", "total"],
+    ["AC", "AC"], ["AC", "touch"], ["AC", "flat_footed"],
+    ["saves", "fort"], ["saves", "ref"], ["saves", "will"],
+    ["ability_scores", "STR"], ["ability_scores", "DEX"], ["ability_scores", "CON"],
+    ["ability_scores", "INT"], ["ability_scores", "WIS"], ["ability_scores", "CHA"],
+    ["BAB"], ["CMB"], ["CMD"]
+]
+# Dicts whose numeric entries each become a column, since which ones there are depends on the data
+open_columns = [["AC", "components"], ["speeds"]]
+
+
+def isNumber(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+def getPath(pageObject, path):
+    for k in path:
+        if type(pageObject) is not dict or k not in pageObject:
+            return None
+        pageObject = pageObject[k]
+    return pageObject
+
+def extractColumns(d):
+    """
+    Returns:
+        tuple: (list of urls, dict of column name ("AC/components/dex") to a list of values, None where missing)
+    """
+    paths = [list(path) for path in fixed_columns]
+    for prefix in open_columns:
+        keys = set()
+        for pageObject in d.values():
+            node = getPath(pageObject, prefix)
+            if type(node) is dict:
+                keys.update(k for k, v in node.items() if isNumber(v))
+        paths += [prefix + [k] for k in sorted(keys)]
+
+    urls = []
+    columns = {"/".join(path): [] for path in paths}
+    for url, pageObject in d.items():
+        urls.append(url)
+        for path in paths:
+            v = getPath(pageObject, path)
+            columns["/".join(path)].append(v if isNumber(v) else None)
+    return urls, columns
+
+
+def writeNpy(path, descr, shape, data):
+    # The .npy format is a short header describing the array followed by its raw bytes, so it can be written without numpy
+    header = repr({"descr": descr, "fortran_order": False, "shape": shape}) + " "
+    header += " " * ((64 - (10 + len(header) + 1) % 64) % 64) + "\n"  # The data has to start on a multiple of 64 bytes
+    with open(path, 'wb') as fp:
+        fp.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode('latin1'))
+        fp.write(data)
+
+def writeNpyColumns(outdir, urls, columns):
+    os.makedirs(outdir, exist_ok=True)
+    order = "<" if sys.byteorder == "little" else ">"
+    width = max((len(url) for url in urls), default=1)
+    writeNpy(os.path.join(outdir, "urls.npy"), order + "U" + str(width), (len(urls),),
+             b"".join(url.ljust(width, "\0").encode('utf-32-le' if order == "<" else 'utf-32-be') for url in urls))
+    for name, values in columns.items():
+        data = array('d', (float("nan") if v is None else v for v in values))
+        writeNpy(os.path.join(outdir, name.replace("/", ".") + ".npy"), order + "f8", (len(values),), data.tobytes())
+
+def writeArrowColumns(path, urls, columns, parquet):
+    import pyarrow as pa
+    arrays = {"url": pa.array(urls, type=pa.string())}
+    for name, values in columns.items():
+        whole = all(v is None or float(v).is_integer() for v in values)
+        arrays[name] = pa.array([None if v is None else (int(v) if whole else float(v)) for v in values], type=pa.int64() if whole else pa.float64())
+    table = pa.table(arrays)
+    if parquet:
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the numeric statblock fields of every monster as columns.")
+    parser.add_argument("datapath", nargs="?", default="data/data.json", help="the database to export (default data/data.json)")
+    parser.add_argument("--format", default="npy", choices=["npy", "parquet", "arrow"], help="npy needs nothing installed, parquet and arrow need pyarrow (default npy)")
+    parser.add_argument("--output", "-o", help="where to write the columns (default columns/, columns.parquet or columns.arrow next to the database)")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt != "npy":
+        try:
+            import pyarrow
+        except ImportError:
+            print(f"pyarrow is not installed, which {fmt} needs, falling back to npy")
+            fmt = "npy"
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(args.datapath)), "columns" if fmt == "npy" else "columns." + fmt)
+
+    print("Loading data...", end="", flush=True)
+    d = loadData(args.datapath)
+    print(" done")
+
+    print("Extracting columns...", end="", flush=True)
+    urls, columns = extractColumns(d)
+    print(" done")
+
+    print(f"Writing {len(columns)} columns for {len(urls)} monsters to {output}...", end="", flush=True)
+    if fmt == "npy":
+        writeNpyColumns(output, urls, columns)
+    else:
+        writeArrowColumns(output, urls, columns, fmt == "parquet")
+    print(" done")
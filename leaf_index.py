@@ -0,0 +1,206 @@
+import json
+import os
+import pickle
+import sqlite3
+
+from parse_cache import hashBytes
+
+
+# explore_data.py and create_csv.py both need unique_leaves_lookup, unique_leaves and unique_leaves_counts, which take
+# decoding every monster to generate. The leaf index keeps them next to data.json (as data.json.leaves.sqlite) so they're
+# only generated once per version of data.json:
+#
+#   dicts   the three dicts, pickled, so a session can load them whole without touching data.json
+#   leaves  one row per (path, leaf value, url), so single paths can be queried without loading anything else
+#   strings a full-text (FTS5) index of the strings in TEXT_FIELDS, for explore_data.text_search
+#
+# The index records the sha256 of the data.json it was built from, and is rebuilt when that changes.
+
+LEAF_INDEX_SUFFIX = ".leaves.sqlite"
+TEXT_FIELDS = ["spells", "spell_like_abilities", "psychic_magic", "special_abilities", "desc_short", "desc_long"]
+
+
+def hashFile(path):
+    with open(path, 'rb') as fp:
+        return hashBytes(fp.read())
+
+def splitPath(path):
+    # Paths can be given as a list of keys, or as a string like "speeds/fly"
+    if isinstance(path, str):
+        return [k for k in path.split("/") if k != ""]
+    return list(path)
+
+
+class LeafIndex:
+    """
+    An on-disk index of the unique leaves of a data.json, stored in a single sqlite file
+
+    Use isCurrent() to check it was built from the data.json it's next to, and store() to (re)build it. The text index
+    is built separately, with hasText() and storeText(), since only text searches need it.
+    """
+
+    def __init__(self, jsonPath):
+        self.jsonPath = jsonPath
+        self.conn = sqlite3.connect(jsonPath + LEAF_INDEX_SUFFIX)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dicts (name TEXT PRIMARY KEY, data BLOB)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS paths (id INTEGER PRIMARY KEY, path TEXT UNIQUE)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS leaves (path INTEGER, value TEXT, url TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS leaves_path_value ON leaves (path, value)")
+        self.conn.commit()
+
+    def createTextTable(self):
+        # Only created once the text index is used, so an sqlite built without FTS5 only breaks text searches
+        self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS strings USING fts5 (url UNINDEXED, path UNINDEXED, is_key UNINDEXED, text)")
+
+    def getMeta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def setMeta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def dataHash(self):
+        # Only hash data.json if it looks like it changed since it was last hashed
+        stat = os.stat(self.jsonPath)
+        stat = f"{stat.st_size} {stat.st_mtime_ns}"
+        if self.getMeta("stat") == stat and self.getMeta("stat_hash") is not None:
+            return self.getMeta("stat_hash")
+        dataHash = hashFile(self.jsonPath)
+        self.setMeta("stat", stat)
+        self.setMeta("stat_hash", dataHash)
+        self.conn.commit()
+        return dataHash
+
+    def isCurrent(self):
+        """
+        Returns:
+            bool: Whether the dicts and leaves were built from the current contents of data.json
+        """
+        return self.getMeta("data_hash") == self.dataHash()
+
+    def hasText(self):
+        """
+        Returns:
+            bool: Whether the text index was built from the current contents of data.json
+        """
+        self.createTextTable()
+        return self.getMeta("text_hash") == self.dataHash()
+
+    def store(self, unique_leaves_lookup, unique_leaves, unique_leaves_counts):
+        dataHash = self.dataHash()
+        self.conn.execute("DELETE FROM meta WHERE key = 'data_hash'")
+        self.conn.execute("DELETE FROM dicts")
+        self.conn.execute("DELETE FROM paths")
+        self.conn.execute("DELETE FROM leaves")
+        for name, d in [("unique_leaves_lookup", unique_leaves_lookup), ("unique_leaves", unique_leaves), ("unique_leaves_counts", unique_leaves_counts)]:
+            self.conn.execute("INSERT INTO dicts VALUES (?, ?)", (name, pickle.dumps(d, pickle.HIGHEST_PROTOCOL)))
+
+        def addRows(node, path):
+            pathId = None
+            for k, v in node.items():
+                if type(v) is dict:
+                    addRows(v, path + [k])
+                    continue
+                if pathId is None:
+                    pathId = self.conn.execute("INSERT INTO paths (path) VALUES (?)", (json.dumps(path),)).lastrowid
+                value = json.dumps(k)
+                self.conn.executemany("INSERT INTO leaves VALUES (?, ?, ?)", ((pathId, value, url) for url in sorted(v)))
+
+        addRows(unique_leaves_lookup, [])
+        # The hash goes in last, so an interrupted build never looks current
+        self.setMeta("data_hash", dataHash)
+        self.conn.commit()
+
+    def storeText(self, d):
+        """
+        Build the text index from the database, with one row for every string (dict values and keys) under TEXT_FIELDS
+        """
+        self.createTextTable()
+        dataHash = self.dataHash()
+        self.conn.execute("DELETE FROM meta WHERE key = 'text_hash'")
+        self.conn.execute("DELETE FROM strings")
+
+        def rows(url, node, path):
+            if type(node) is dict:
+                for k, v in node.items():
+                    yield (url, json.dumps(path + [k]), 1, k)
+                    yield from rows(url, v, path + [k])
+            elif type(node) is list:
+                for i, x in enumerate(node):
+                    yield from rows(url, x, path + [i])
+            elif type(node) is str:
+                yield (url, json.dumps(path), 0, node)
+
+        for url, pageObject in d.items():
+            for field in TEXT_FIELDS:
+                if field in pageObject:
+                    self.conn.executemany("INSERT INTO strings VALUES (?, ?, ?, ?)", rows(url, pageObject[field], [field]))
+        self.setMeta("text_hash", dataHash)
+        self.conn.commit()
+
+    def searchText(self, query):
+        """
+        Run an FTS5 query against the text index, e.g. '"limited wish"' for a phrase or 'fire AND breath' for two words
+
+        Returns:
+            list: (url, path, is_key, text) of each matching string, best match first. path is a list of keys and list
+                indices, and is_key says whether the string is the dict key at the end of path rather than its value
+        """
+        self.createTextTable()
+        rows = self.conn.execute("SELECT url, path, is_key, text FROM strings WHERE strings MATCH ? ORDER BY rank", (query,))
+        return [(url, json.loads(path), bool(isKey), text) for url, path, isKey, text in rows]
+
+    def load(self, name):
+        """
+        Returns:
+            dict: unique_leaves_lookup, unique_leaves or unique_leaves_counts, as they were stored
+        """
+        row = self.conn.execute("SELECT data FROM dicts WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return pickle.loads(row[0])
+
+    def paths(self):
+        """
+        Returns:
+            list: Every path that has leaves, as "a/b/c" strings
+        """
+        return ["/".join(json.loads(path)) for path, in self.conn.execute("SELECT path FROM paths ORDER BY id")]
+
+    def values(self, path):
+        """
+        Returns:
+            list: The unique leaf values at a path, like unique_leaves at that path
+        """
+        rows = self.conn.execute("SELECT DISTINCT leaves.value FROM leaves JOIN paths ON leaves.path = paths.id WHERE paths.path = ? ORDER BY leaves.rowid", (json.dumps(splitPath(path)),))
+        return [json.loads(value) for value, in rows]
+
+    def counts(self, path):
+        """
+        Returns:
+            dict: How many monsters have each leaf value at a path, like unique_leaves_counts at that path
+        """
+        rows = self.conn.execute("SELECT leaves.value, COUNT(*) FROM leaves JOIN paths ON leaves.path = paths.id WHERE paths.path = ? GROUP BY leaves.value ORDER BY MIN(leaves.rowid)", (json.dumps(splitPath(path)),))
+        return {json.loads(value): n for value, n in rows}
+
+    def urls(self, path, value):
+        """
+        Returns:
+            set: The urls of the monsters with the given leaf value at a path, like unique_leaves_lookup at that path and value
+        """
+        rows = self.conn.execute("SELECT leaves.url FROM leaves JOIN paths ON leaves.path = paths.id WHERE paths.path = ? AND leaves.value = ?", (json.dumps(splitPath(path)), json.dumps(value)))
+        return {url for url, in rows}
+
+    def urlsUnder(self, path):
+        """
+        Returns:
+            set: The urls of the monsters with any leaf at or below a path
+        """
+        path = json.dumps(splitPath(path))
+        prefix = path[:-1] + ", "  # The start of the json of every path below it
+        rows = self.conn.execute("SELECT DISTINCT leaves.url FROM leaves JOIN paths ON leaves.path = paths.id WHERE paths.path = ? OR substr(paths.path, 1, ?) = ?", (path, len(prefix), prefix))
+        return {url for url, in rows}
+
+    def close(self):
+        self.conn.close()
@@ -17,15 +17,31 @@ from tqdm import tqdm
 import traceback
 import sys
 import json
+import argparse
+import multiprocessing
 import regex as re
-from bs4 import BeautifulSoup, NavigableString
+from bs4 import BeautifulSoup, NavigableString, FeatureNotFound
+from bs4.builder import HTMLTreeBuilder
 
 import inspect
 import logging
 import linecache
 
+from parse_cache import ParseCache, hashBytes, parserFingerprint
+from download_pages import loadManifest
+from corpus import CorpusReader, CORPUS_FILENAME
+from patterns import regexes, trieRegex
+from profiling import profiler
+from datafile import NdjsonWriter, buildDataJson, NDJSON_FILENAME, JSON_FILENAME
+
 include3_5 = True
 
+# The BeautifulSoup tree builder parsePage uses. html.parser is built in; lxml is much faster, but has to be installed. See setHtmlParser
+html_parser = "html.parser"
+
+# Whether parsePage slices the statblock out of the raw page before parsing it (see extractStatblock), or parses the whole page
+extract_statblock = True
+
 
 #####################
 # PROGRAM
@@ -33,6 +49,29 @@ include3_5 = True
 
 
 sizes = ['Fine', 'Diminutive', 'Tiny', 'Small', 'Medium', 'Large', 'Huge', 'Gargantuan', 'Colossal']
+asterisk_options = ["**", "*", "†"]  # Should put things like ** before * for regex matching and such
+treasure_types = ['none', 'incidental', 'half', 'standard', 'double', 'triple', 'NPC Gear']
+
+# Patterns used by parsePage that are built from the lists above or are run many times per page, compiled once up front.
+# Every other pattern in parsePage goes through regexes.search/sub/split, which compiles it on first use. See main.py --regex-stats
+weird_whitespace_regex = regexes.compile(r'[\r\n\xad]+', name="cleanup: weird whitespace")  # Fix weird whitespace in some entries (e.g. Vermlek, Achaierai, Signifer of the Nail, Vampiric Mist). See normalizeHtml
+whitespace_char_regex = regexes.compile(r'\s', name="cleanup: whitespace char")
+cleanup_br_regex = regexes.compile(r'<\s*/?\s*br\s*/?\s*>', name="cleanup: br")  # Fix broken and messy <br>s, e.g. Vilderavn and Fulgati, where </br> and <br/ > seem to cause problems
+cleanup_replacements = [(c, "-") for c in ["−", "—", "–", "‐", "‑", "‒", "―", "&ndash;", "&mdash;"]] + [("’", "'")]  # No reason to deal with all these different dashes, and fix dumb apostrophes like in Shaorhaz, Glutton of the Green
+sup_separator_regex = regexes.compile(r'[;,] ', name="superscript separator")
+asterisk_regex = regexes.compile(r'(?:' + r'|'.join(re.escape(x) for x in asterisk_options) + r')', name="asterisk")
+asterisk_line_regex = regexes.compile(r'^(' + r'|'.join(re.escape(x) for x in asterisk_options) + r') ', name="asterisk line")
+alignment_regex = regexes.compile(r'^(.+) (' + "|".join(sizes) + r') ([^(]+)(?: \((.+)\))?$', name="alignment line")
+attack_regex = regexes.compile(r'^(\d+(?:d\d+(?:[+-]\d+)?)?)?\s*(.*?)\s*((?:[+-]\d+/)*[+-]\d+)?(?:\s+(?:(?:melee|ranged|(incorporeal))\s+)?(touch)?(?: attack)?)?\s*(?:\(([^)]+)\)\s*(?:\(([^)]+)\)| plus (.+?))?)?$', name="attack")
+attack_damage_regex = regexes.compile(r'^((?:\d+d\d+|[\d.]+)(?: *[+-] *(?:\d+d\d+|[\d.]+))*(?:/(?:\d+d\d+[+-]\d+))?(?: per .+?(?=/))?)(.*?)(?: *vs\. (.+?))?$', name="attack damage")  # Special cases in this regex: periods allowed in attack damage for Frost Giant Hunter, "per" syntax for Thorny, vs. see below, slash for Forge Rider and Criminal (Street Thug)
+crit_block_comma_regex = regexes.compile(r'^(.+?),\s?(\d+ *- *\d+)$', name="crit block after comma")
+crit_block_pure_regex = regexes.compile(r'^(.*?)/(?:(\d+ *- *\d+)(?:/\s*[×x] *(\d))?|[×x] *(\d)) *$', name="crit block")
+crit_block_regex = regexes.compile(r'^(.*?)/(?:(\d+ *- *\d+)(?:/\s*[×x] *(\d))?|[×x] *(\d)) *(?: (?!/)(.+?))?$', name="crit block with trailing text")
+treasure_regex = regexes.compile(r'^(' + "|".join(treasure_types) + r')(?:\s+\((.+?)\))?$', re.IGNORECASE, name="treasure")
+main_div_regex = regexes.compile(r'<(?i:div)\s[^>]*?(?<![-\w])(?i:id)\s*=\s*(?:"main"|\'main\'|main(?=[\s>]))', name="statblock: main div")
+statblock_tag_regex = regexes.compile(r'<!--.*?-->|<(/?)([a-z][^\s/>]*)[^>]*?(/?)>', re.IGNORECASE | re.DOTALL, name="statblock: tags")
+split_groups_pattern = r'(?P<group>\((?>[^()\[\]]++|(?&group))*\)|\[(?>[^()\[\]]++|(?&group))*\])'  # Properly nested parens and brackets, for splitP
+advancement_size_regex = regexes.compile(r'^(\d+)(?:-(\d+)|\+) (?:HD )?\((' + "|".join(sizes) + r')\)$', re.IGNORECASE, name="3.5 advancement by size")
 
 def parseInt(s, stringIfFail=False):
     def _parseInt(s):
@@ -47,27 +86,175 @@ def parseInt(s, stringIfFail=False):
         return _parseInt(s)
 
 
+def splitP(s, handleAnd=False, sep=r', '):
+    """
+    Split on a separator, except where it is inside parens or brackets
+
+    Groups of parens and brackets, nested ones included, are skipped over whole in the same regex pass that finds the
+    separators. If some closing paren or bracket isn't part of a properly nested group, this falls back to the old rule,
+    which treats a separator as inside parens (or brackets) if the next paren (or bracket) after it is a closing one.
+
+    Args:
+        s (str): The string to split
+        handleAnd (bool): Whether to strip an "and " from the start of the last entry
+        sep (str): Regex for the separator, without capturing groups
+
+    Returns:
+        list: The entries
+    """
+    if "(" not in s and ")" not in s and "[" not in s and "]" not in s:
+        o = regexes.split(sep, s)
+    else:
+        # Also split on closing parens and brackets outside of groups, capturing them so we can tell if there were any
+        o = regexes.split(r'(?:' + split_groups_pattern + r')(*SKIP)(*FAIL)|([)\]])|' + sep, s)
+        if any(o[2::3]):
+            o = regexes.split(sep + r'(?![^()]*\)|[^\[\]]*\])', s)
+        else:
+            o = o[::3]  # Drop the (always empty) captures
+    if handleAnd and o[-1].strip().startswith("and "):
+        o[-1] = o[-1].strip()[4:]
+    return o
+
+
+def inCell(containers):
+    # Whether the open tags include a td inside a tr inside a table, not necessarily directly
+    found = 0
+    for name in containers:
+        if name == ["table", "tr", "td"][found]:
+            found += 1
+            if found == 3:
+                return True
+    return False
+
+def closeTag(containers, name):
+    """
+    Close a tag the way html.parser's tree builder does: the innermost open tag of that name closes, along with
+    everything opened inside it
+
+    Returns:
+        bool: Whether there was an open tag of that name to close
+    """
+    if name not in containers:
+        return False
+    del containers[len(containers) - 1 - containers[::-1].index(name):]
+    return True
+
+def extractStatblock(html):
+    """
+    Slice the statblock span (the first "div#main table tr td span") out of the raw page html
+
+    The main div is the first div whose id is exactly "main", so neither id="main-nav" nor data-id="main" count, just as
+    they don't for the selector. Every tag from there to the end of the span is followed, not the whole tree, so this
+    bails out whenever BeautifulSoup could see the span differently: a close tag for the main div or anything outside
+    it before the span is found, a close tag inside the span for something opened before it (like the </b> in
+    "<b><span>...</b>", which ends the span early), scripts, or no matching close tag for the span.
+
+    Returns:
+        str: The html of the span, or None if the caller should fall back to parsing the whole page
+    """
+    result = main_div_regex.search(html)
+    if result is None:
+        return None
+
+    # Walk down to the first span inside a cell of a table inside the main div, keeping the tags that are open
+    containers = []
+    start = None
+    for tag in statblock_tag_regex.finditer(html, result.end()):
+        name = tag.group(2)
+        if name is None:  # Comment
+            continue
+        name = name.lower()
+        closing = tag.group(1) == "/"
+        if name in ["script", "style"]:
+            return None
+        if name in HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS or (tag.group(3) == "/" and not closing):  # Never left open
+            continue
+
+        if start is None:
+            if not closing:
+                if name == "span" and inCell(containers):
+                    start = tag.start()
+                    inside = ["span"]
+                else:
+                    containers.append(name)
+            elif not closeTag(containers, name):  # Closes the main div or something outside it
+                return None
+            continue
+
+        # Inside the span, find its matching close tag. A close tag with no matching open inside the span would
+        # close something the span is inside (and the span along with it), so leave that to BeautifulSoup
+        if not closing:
+            inside.append(name)
+        elif not closeTag(inside, name):
+            return None
+        elif len(inside) == 0:
+            return html[start:tag.end()]
+
+    return None
+
+def weirdWhitespaceReplacement(result):
+    """
+    Work out what the original two weird whitespace passes left of one run of \\r, \\n and \\xad characters
+
+    Those passes were: delete weird whitespace bordering whitespace, then replace what remains with a space.
+    The first pass could also split a run and delete most of it, since \\r and \\n are whitespace themselves.
+    """
+    s, start, end = result.string, result.start(), result.end()
+    # Uses the regex module's \s rather than str.isspace, since they disagree on a few control characters
+    if (start > 0 and whitespace_char_regex.compiled.match(s, start - 1)) or whitespace_char_regex.compiled.match(s, end):
+        return ""
+    # The part of the run before its last \r or \n borders whitespace, and so does the rest unless a \xad comes just before it
+    run = result.group()
+    last = max(run.rfind("\r"), run.rfind("\n"))
+    if last > 0 and run[last - 1] != "\xad":
+        return ""
+    return " "
+
+def normalizeHtml(html):
+    """
+    Clean up the quirks in the raw html that would otherwise trip up parsePage
+
+    Weird whitespace is dropped or turned into a space, all forms of <br> become <br/>, dashes become "-", and curly
+    apostrophes become "'". This gives exactly the same result as the original chain of six regex passes (kept in
+    compare_parsers.py, which checks the two against each other), but with two regex passes and some plain string replaces.
+
+    Returns:
+        str: The cleaned up html
+    """
+    html = weird_whitespace_regex.sub(weirdWhitespaceReplacement, html)
+    html = cleanup_br_regex.sub(r'<br/>', html)  # The original </br> fix is subsumed by this one, which turns </br> into <br/> anyway
+    for old, new in cleanup_replacements:
+        if old in html:
+            html = html.replace(old, new)
+    return html
+
 def parsePage(html, url):
     # Init the object we'll be building
     pageObject = {}
 
+    profiler.section("statblock extraction")
+    # Cut the page down to just the statblock, so the cleanup and soup only have to deal with the part we use
+    statblock = extractStatblock(html) if extract_statblock else None
+    if statblock is not None:
+        html = statblock
+
+    profiler.section("cleanup")
     # Clean up HTML
-    regex = r'(?:\r\n|\r|\xad|' + chr(10) + ')+'  # Fix weird whitespace in some entries (e.g. Vermlek, Achaierai, Signifer of the Nail, Vampiric Mist)
-    html = re.sub(r'(?<=\s+)' + regex + r'|' + regex + r'(?=\s+)', r'', html)  # First handle weird whitespace bordering regular whitespace - just delete it
-    html = re.sub(regex, r' ', html)  # Then handle weird whitespace bordering non-whitespace - replace with a space
-    html = re.sub(r'(?<!<\s*br\s*>\s*)<\s*/\s*br\s*>', r'<br/>', html)  # Fix broken <br> tags in some pages, e.g. Vilderavn. Uses a variable-width negative lookbehind, so we use the regex module instead of the re module
-    html = re.sub(r'<\s*/?\s*br\s*/?\s*>', r'<br/>', html)  # Further fix messy <br>s, e.g. Fulgati, where <br/ > seems to cause problems
-    html = re.sub(r'[−—–‐‑‒―]|&ndash;|&mdash;', "-", html)  # No reason to deal with all these different dashes
-    html = re.sub(r'’', r"'", html)  # Fix dumb apostrophes like in Shaorhaz, Glutton of the Green
+    html = normalizeHtml(html)
 
+    profiler.section("soup")
     # Parse HTML into an object
-    soup = BeautifulSoup(html, "html.parser")
-    e = soup.select_one("div#main table tr td span")
+    soup = BeautifulSoup(html, html_parser)
+    if statblock is not None:
+        e = soup.find("span")
+    else:
+        e = soup.select_one("div#main table tr td span")
 
+    profiler.section("superscripts")
     # Handle superscripts with commas/semicolons in them - just split them into multiple superscripts
     for tag in e.find_all("sup"):
-        if not re.search(r'[;,] ', tag.get_text()) is None:
-            for s in re.split(r'[;,] ', tag.get_text()):
+        if not sup_separator_regex.search(tag.get_text()) is None:
+            for s in sup_separator_regex.split(tag.get_text()):
                 if s.strip() == "":  # Eliminate empty superscripts, mostly for Dagon
                     continue
 
@@ -95,52 +282,48 @@ def parsePage(html, url):
         if isinstance(e[i], NavigableString) and e[i].strip() == "":
             i += 1
 
-    # Helper function to split on separator while avoiding splitting on commas inside parens
-    def splitP(s, handleAnd=False, sep=r', '):
-        o = re.split(sep + r'(?![^()]*\)|[^\[\]]*\])', s)
-        if handleAnd and o[-1].strip().startswith("and "):
-            o[-1] = o[-1].strip()[4:]
-        return o
-
     # Helper function to collect all following text, handling unpredictable nodes
     # Doesn't stop until it hits a node on the tags list
     # Will advance nodes
     # Use the special "[text]" value for text nodes
     def collectText(tags, skip=["sup"], mark=[]):
         nonlocal e, i
-        text, advance = collectTextRec(e[i:], tags, skip, mark)
-        i += advance
-        return text
-
-    def collectTextRec(e, tags, skip, mark):
-        text = ""
-        i = 0
-        while i < len(e):
-            if ("[text]" in tags and isinstance(e[i], NavigableString)) or (not isinstance(e[i], NavigableString) and e[i].name in tags):
+        pieces = []
+        i = collectTextRec(e, i, set(tags), set(skip), set(mark), pieces)
+        return "".join(pieces)
+
+    # Walks the nodes in place from start, appending their text to pieces, and returns the index of the node it stopped at
+    def collectTextRec(nodes, start, tags, skip, mark, pieces):
+        i = start
+        while i < len(nodes):
+            node = nodes[i]
+            name = "[text]" if isinstance(node, NavigableString) else node.name
+            if name in tags:
                 break
 
-            if ("[text]" in skip and isinstance(e[i], NavigableString)) or (not isinstance(e[i], NavigableString) and e[i].name in skip):
+            if name in skip:
                 i += 1
                 continue
 
-            if isinstance(e[i], NavigableString):
-                s = e[i]
-            elif e[i].name == "br":
-                s = "\n"
-            elif len(e[i].contents) > 0:
-                s, _ = collectTextRec(e[i].contents, tags, skip, mark)
-            else:
-                s = e[i].get_text()
-
             # Mark if requested
-            if ("[text]" in mark and isinstance(e[i], NavigableString)) or (not isinstance(e[i], NavigableString) and e[i].name in mark):
-                tagName = "[text]" if isinstance(e[i], NavigableString) else e[i].name
-                s = "<" + tagName + ">" + s + "</" + tagName + ">"
+            marked = name in mark
+            if marked:
+                pieces.append("<" + name + ">")
+
+            if name == "[text]":
+                pieces.append(node)
+            elif name == "br":
+                pieces.append("\n")
+            elif len(node.contents) > 0:
+                collectTextRec(node.contents, 0, tags, skip, mark, pieces)
+            else:
+                pieces.append(node.get_text())
 
-            text += s
+            if marked:
+                pieces.append("</" + name + ">")
 
             i += 1
-        return text, i
+        return i
 
     # Helper to unwrap parens
     def unwrapParens(s):
@@ -157,10 +340,8 @@ def parsePage(html, url):
         return s
 
     # Helper to remove asterisks
-    asterisk_options = ["**", "*", "†"]  # Should put things like ** before * for regex matching and such
-
     def handleAsterisk(s):
-        return re.sub(r'(?:' + r'|'.join(re.escape(x) for x in asterisk_options) + r')', '', s).strip()
+        return asterisk_regex.sub('', s).strip()
 
     # Helper to update nested dicts
     def updateNestedDict(d1, d2):
@@ -172,11 +353,12 @@ def parsePage(html, url):
             else:
                 d1[k].update(d2[k])
 
+    profiler.section("asterisk sweep")
     # Sweep for asterisk lines, then return back to the beginning to start the real parse
     while i < len(e) - 1:
         if not isinstance(e[i], NavigableString) and e[i].name == "br":
             if isinstance(e[i+1], NavigableString):
-                result = re.search(r'^(' + r'|'.join(re.escape(x) for x in asterisk_options) + r') ', str(e[i+1]).strip())
+                result = asterisk_line_regex.search(str(e[i+1]).strip())
                 if result is None:
                     i += 1
                     continue
@@ -208,7 +390,7 @@ def parsePage(html, url):
             if not "asterisk" in pageObject:
                 pageObject["asterisk"] = {}
 
-            result = re.search(r'^' + re.escape(asterisk) + r'\s*(.+)$', s)
+            result = regexes.search(r'^' + re.escape(asterisk) + r'\s*(.+)$', s)
             soft_assert(not result is None, url + " |" + s + "|")
             soft_assert(not result.group(1) in pageObject["asterisk"], url + " |" + s + "|")
             pageObject["asterisk"][asterisk] = result.group(1)
@@ -216,6 +398,7 @@ def parsePage(html, url):
             i += 1
     i = 0
 
+    profiler.section("multiple statblock pre-sweep")
     # Skip preamble sections, like in Mythic Nalfeshnee
     while not (e[i].name == "h1" and ((e[i+1].name == "i" and e[i+2].name == "h2") or e[i+1].name == "h2")):
         i += 1
@@ -239,6 +422,7 @@ def parsePage(html, url):
     if titleCount > 1:
         pageObject["second_statblock"] = True
 
+    profiler.section("title")
     # Get main title
     soft_assert(e[i].name == "h1" and e[i]['class'] == ['title'], url)
     pageObject["title1"] = e[i].get_text()
@@ -253,7 +437,7 @@ def parsePage(html, url):
 
     # Get statblock title & CR
     soft_assert(e[i].name == "h2" and e[i]['class'] == ['title'], url)
-    result = re.search(r'^(.+) CR ([0-9/-]+?)(?:/MR (\d+))?$', e[i].get_text())
+    result = regexes.search(r'^(.+) CR ([0-9/-]+?)(?:/MR (\d+))?$', e[i].get_text())
     soft_assert(not result is None, "CR-finding Regex failed for " + url)
     pageObject["title2"] = result.group(1)
     pageObject["CR"] = float(Fraction(result.group(2))) if "/" in result.group(2) else parseInt(result.group(2), stringIfFail=True)
@@ -263,6 +447,7 @@ def parsePage(html, url):
         pageObject["MR"] = parseInt(result.group(3))
     i += 1
 
+    profiler.section("sources")
     # Get sources
     soft_assert(e[i].name == "b" and e[i].get_text() == "Source", url)
     i += 1
@@ -271,7 +456,7 @@ def parsePage(html, url):
     pageObject["sources"] = []
     while e[i].name == "a":
         s = e[i].get_text()
-        result = re.search(r'^(.+?) pg\. (\d+)', s)
+        result = regexes.search(r'^(.+?) pg\. (\d+)', s)
         soft_assert(not result is None, url + " |" + s + "|")
         pageObject["sources"].append({
             "name": result.group(1).strip(),
@@ -284,6 +469,7 @@ def parsePage(html, url):
     soft_assert(len(pageObject["sources"]) > 0, url)
     skipBr()
 
+    profiler.section("XP")
     # Get XP if present (might be blank if there is none, such as with a Butterfly/Moth)
     if e[i].name == "b" and e[i].get_text() == "XP":
         i += 1
@@ -299,7 +485,7 @@ def parsePage(html, url):
     # Special case: Nupperibo. Has a nonstandard line to cite a 3rd-party source for the official material
     if pageObject["title2"] == "Nupperibo":
         s = collectText(["br"]).strip()
-        result = re.search(r"^(.+?) (\d+)$", s)
+        result = regexes.search(r"^(.+?) (\d+)$", s)
         soft_assert(not result is None, s)
         pageObject["sources"].append({
             "name": result.group(1).strip(),
@@ -308,6 +494,7 @@ def parsePage(html, url):
         })
         skipBr()
 
+    profiler.section("race and class")
     # Get race and class levels if present
     s = collectText(["br"]).strip()
     skipBr()
@@ -342,7 +529,7 @@ def parsePage(html, url):
             elif not "variant" in pageObject["race_class"]["prefix"]:
                 pageObject["race_class"]["prefix"].append("variant")
         # Handle ending parenthetical if present
-        result = re.search(r'^(.+?) \(([^)]+?)\)$', s)
+        result = regexes.search(r'^(.+?) \(([^)]+?)\)$', s)
         if not result is None:
             s = result.group(1).strip()
             sources = result.group(2).split(", ")
@@ -354,7 +541,7 @@ def parsePage(html, url):
                     pageObject["race_class"]["sources"].append({"name": pageObject["race_class"]["sources"][-1]["name"],
                                                                 "page": parseInt(source)})
                     continue
-                result = re.search(fr"^(.+?) (\d+)$", source)
+                result = regexes.search(fr"^(.+?) (\d+)$", source)
                 soft_assert(not result is None, f'Invalid race/class source block "{source}" in {url}')
                 pageObject["race_class"]["sources"].append({"name": result.group(1).strip(),
                                                             "page": parseInt(result.group(2))})
@@ -364,15 +551,13 @@ def parsePage(html, url):
                     pageObject["race_class"]["sources"][-1]["name"] = pageObject["sources"][0]["name"]
         # Handle classes if present
         if s[-1].isdigit():
-            class_reg = "(?:" + "|".join(sorted((re.escape(n.lower()) for n in class_hds), key=len, reverse=True)) + ")"
-            class_reg_block = fr"{class_reg} (?:of [\w' -]+ )?(?:\([^)]+?\) )?\d+"
-            result = re.search(fr"(?:^|\s+){class_reg_block}(?:/{class_reg_block})*$", s, re.IGNORECASE)
+            result = class_line_regex.search(s)
             soft_assert(not result is None, f'Class regex failed on "{s}" in {url}')
             classes = s[result.start():].strip().split("/")
             s = s[:result.start()].strip()
             pageObject["race_class"]["class"] = []
             for c in classes:
-                result = re.search(fr"^({class_reg}) (?:of ([\w' -]+) )?(?:\(([^)]+?)\) )?(\d+)$", c, re.IGNORECASE)
+                result = class_block_regex.search(c)
                 soft_assert(not result is None, f'Invalid class block "{c}" in {url}')
                 pageObject["race_class"]["class"].append({"name": result.group(1).strip(),
                                                         "level": parseInt(result.group(4))})
@@ -400,8 +585,9 @@ def parsePage(html, url):
         pageObject["race_class"]["race"] = s2[0].upper() + s2[1:]
         skipBr()
 
+    profiler.section("alignment, size and type")
     # Get alignment, size, type, subtypes
-    result = re.search(r'^(.+) (' + "|".join(sizes) + r') ([^(]+)(?: \((.+)\))?$', handleAsterisk(s))
+    result = alignment_regex.search(handleAsterisk(s))
     soft_assert(not result is None, "Alignment Line Regex failed for " + url + " |" + handleAsterisk(s) + "|")
     pageObject["alignment"] = {"raw": result.group(1), "cleaned": result.group(1).replace("Always ", "")}
     pageObject["size"] = result.group(2)
@@ -409,12 +595,13 @@ def parsePage(html, url):
     if result.group(4) is not None:
         pageObject["subtypes"] = splitP(result.group(4))
 
+    profiler.section("initiative")
     # Get initiative
     soft_assert(e[i].name == "b" and e[i].get_text() == "Init", url)
     i += 1
     soft_assert(isinstance(e[i], NavigableString), url)
-    s = collectText("b").strip()
-    result = re.search(r'^([+-]\s*\d+)(?:/([+-]\s*\d+))?\s*(?:\(([+-]\s*\d+)\s+(.+?)\))?\s*(?:[,;]\s*(.+?)\s*)?;$', s)
+    s = collectText(["b"]).strip()
+    result = regexes.search(r'^([+-]\s*\d+)(?:/([+-]\s*\d+))?\s*(?:\(([+-]\s*\d+)\s+(.+?)\))?\s*(?:[,;]\s*(.+?)\s*)?;$', s)
     soft_assert(not result is None, "Initiative Regex failed for " + url + " |" + s + "|")
     if not result.group(2) is None:  # Check for dual initiative
         pageObject["initiative"] = {"bonus": [parseInt(result.group(1)), parseInt(result.group(2))]}
@@ -425,16 +612,17 @@ def parsePage(html, url):
     if not result.group(5) is None:  # Initiative abilities
         pageObject["initiative"]["ability"] = result.group(5)
 
+    profiler.section("senses")
     # Get senses
     soft_assert(e[i].name == "b" and e[i].get_text() == "Senses", url)
     i += 1
     s = collectText(["h3", "br"]).strip()
     if not "is_3.5" in pageObject:
-        result = re.search(r'^(?:(.+)[;,])?\s*(Perception\s+[+-]\s*\d+.*?)$', s)  # Regex handles broken formatting on pages like Demonologist that use a comma instead of a semicolon. Space before Perception is variable length because of the typos in Elder Air Elemental and Scarlet Walker, and space inside number because of Mirror Serpent
+        result = regexes.search(r'^(?:(.+)[;,])?\s*(Perception\s+[+-]\s*\d+.*?)$', s)  # Regex handles broken formatting on pages like Demonologist that use a comma instead of a semicolon. Space before Perception is variable length because of the typos in Elder Air Elemental and Scarlet Walker, and space inside number because of Mirror Serpent
         soft_assert(not result is None, "Senses Regex failed for " + url)
         perceptionSkill = result.group(2)  # Save perception skill to combine with skills section later
     else:
-        result = re.search(r'^(?:(.+)[;,])?\s*(Listen\s+[+-]\s*\d+.*?),\s*(Spot\s+[+-]\s*\d+.*?)$', s)
+        result = regexes.search(r'^(?:(.+)[;,])?\s*(Listen\s+[+-]\s*\d+.*?),\s*(Spot\s+[+-]\s*\d+.*?)$', s)
         soft_assert(not result is None, "Senses Regex failed for " + url)
         listenSkill = result.group(2)
         spotSkill = result.group(3)
@@ -443,7 +631,7 @@ def parsePage(html, url):
         pageObject["senses"] = {}
         for entry in entries:
             entry = handleAsterisk(entry.strip())
-            result = re.search(r'^(.+?)\s+(\d+)\s*ft\s*\.?\s*(?:\((.+?)\))?$', entry)
+            result = regexes.search(r'^(.+?)\s+(\d+)\s*ft\s*\.?\s*(?:\((.+?)\))?$', entry)
             if not result is None:
                 pageObject["senses"][result.group(1).lower()] = parseInt(result.group(2))
                 if not result.group(3) is None:
@@ -453,13 +641,14 @@ def parsePage(html, url):
 
     skipBr(optional=True)
 
+    profiler.section("auras")
     # Get auras if present
     if e[i].name == "b" and e[i].get_text() == "Aura":
         i += 1
         pageObject["auras"] = []
         for aura in splitP(collectText(["h3", "br"]).strip()):
             aura_dict = {}
-            result = re.search(r'^(.+?)(?:\s+\((.+?)\))?$', aura)
+            result = regexes.search(r'^(.+?)(?:\s+\((.+?)\))?$', aura)
             soft_assert(not result is None, "Aura Regex failed for " + url)
             aura_dict['name'] = handleAsterisk(result.group(1).strip())
             if not result.group(2) is None:
@@ -467,12 +656,12 @@ def parsePage(html, url):
                 for part in parts:
                     part = part.strip()
 
-                    result = re.search(r'^(\d+)[ -](?:ft\.?|feet)(?: radius)?$', part)
+                    result = regexes.search(r'^(\d+)[ -](?:ft\.?|feet)(?: radius)?$', part)
                     if not result is None:
                         aura_dict['radius'] = parseInt(result.group(1), stringIfFail=True)
                         continue
 
-                    result = re.search(r'^DC (\d+)(?: (Fort|Ref|Will))?$|^(Fort|Ref|Will) DC (\d+) negates$', part)
+                    result = regexes.search(r'^DC (\d+)(?: (Fort|Ref|Will))?$|^(Fort|Ref|Will) DC (\d+) negates$', part)
                     if not result is None:
                         if not result.group(1) is None:
                             aura_dict['DC'] = parseInt(result.group(1))
@@ -483,7 +672,7 @@ def parsePage(html, url):
                             aura_dict['DC_type'] = result.group(3)
                         continue
 
-                    result = re.search(r'^\d+(?:d\d+)? (?:round|minute|hour|day)s?$', part)
+                    result = regexes.search(r'^\d+(?:d\d+)? (?:round|minute|hour|day)s?$', part)
                     if not result is None:
                         aura_dict['duration'] = part
                         continue
@@ -493,6 +682,7 @@ def parsePage(html, url):
                     aura_dict['other'].append(part)
             pageObject['auras'].append(aura_dict)
 
+    profiler.section("AC")
     # DEFENSE
     soft_assert(e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Defense", url)
     i += 1
@@ -502,7 +692,7 @@ def parsePage(html, url):
     i += 1
     s = collectText(["br"]).strip()
     # Accepts ; as well as , because of broken formatting on pages like Bugbear Lurker. Skip broken formatting trailing period in e.g. Flying Fox
-    result = re.search(r'^(-?\d+)[,;]\s+touch\s+([-+]?\d+)[,;]\s*flat-?footed\s*([-+]?\d+)(?:\s*;?\s*\((.+?)\))?(?:;?\s*(.+))?\.?$', s)  
+    result = regexes.search(r'^(-?\d+)[,;]\s+touch\s+([-+]?\d+)[,;]\s*flat-?footed\s*([-+]?\d+)(?:\s*;?\s*\((.+?)\))?(?:;?\s*(.+))?\.?$', s)  
     soft_assert(not result is None, "AC Regex failed for " + url)
     soft_assert(not result is None, "entry: " + s)
     if (not result is None):
@@ -521,7 +711,7 @@ def parsePage(html, url):
             pageObject["AC"]["components"] = {}
             for entry in entries:
                 entry = entry.strip()  # Fixes whitespace issues in e.g. Malsandra (probably caused by \r handling)
-                result = re.search(r'^([+-]\d+)\s+(.+)$', entry)
+                result = regexes.search(r'^([+-]\d+)\s+(.+)$', entry)
                 if not result is None:
                     pageObject["AC"]["components"][result.group(2).lower().strip()] = parseInt(result.group(1))
                 else:
@@ -530,12 +720,13 @@ def parsePage(html, url):
                     pageObject["AC"]["components"]["other"].append(entry)
     skipBr()
 
+    profiler.section("HP")
     # Get HP, and fast healing / regeneration / other HP abilities if present
     soft_assert(e[i].name == "b" and e[i].get_text() == "hp", url)
     i += 1
     soft_assert(isinstance(e[i], NavigableString), url)
     s = handleAsterisk(e[i].strip())
-    result = re.search(r'^(\d+)(?:\s+each)?\s*\((.+?)(?: plus (.+?))?\)(?:[;,] (.+))?$', s)  # Supports , instead of ; for broken formatting on pages like Egregore
+    result = regexes.search(r'^(\d+)(?:\s+each)?\s*\((.+?)(?: plus (.+?))?\)(?:[;,] (.+))?$', s)  # Supports , instead of ; for broken formatting on pages like Egregore
     soft_assert(not result is None, "HP Regex failed for " + url)
     pageObject["HP"] = {
         "total": parseInt(result.group(1)),
@@ -544,7 +735,7 @@ def parsePage(html, url):
     if not result.group(3) is None:
         pageObject["HP"]["plus"] = result.group(3).strip()
     if not result.group(4) is None:
-        result2 = re.search(r'^(fast healing|regeneration)\s+(\d+)(?:\s*\((.+?)\))?$', result.group(4).strip())
+        result2 = regexes.search(r'^(fast healing|regeneration)\s+(\d+)(?:\s*\((.+?)\))?$', result.group(4).strip())
         if not result2 is None:
             pageObject["HP"][result2.group(1).replace(" ", "_")] = parseInt(result2.group(2))
             if not result2.group(3) is None:
@@ -557,7 +748,7 @@ def parsePage(html, url):
     s = pageObject["HP"]["long"]
     if pageObject["title2"] == "Shifty Noble":
         s = s[:-1]
-    result = re.search(r'^(?:(\d+) HD[;,] )?((?:\d+d\d+\+)+)?(\d+d\d+)(?:\+?([+-]\d+))?(?: HD)?$', s)  # Supports double plus for Jiang-Shi typo, comma instead of semicolon for Villager (Farmer), and trailing " HD" for Swamp Mummy
+    result = regexes.search(r'^(?:(\d+) HD[;,] )?((?:\d+d\d+\+)+)?(\d+d\d+)(?:\+?([+-]\d+))?(?: HD)?$', s)  # Supports double plus for Jiang-Shi typo, comma instead of semicolon for Villager (Farmer), and trailing " HD" for Swamp Mummy
     soft_assert(not result is None, f'HP parenthetical regex failed for "{s}" in {url}')
     pageObject["HP"]["bonus_HP"] = parseInt(result.group(4)) if not result.group(4) is None else 0
     HD_blocks = [result.group(3)]
@@ -566,7 +757,7 @@ def parsePage(html, url):
     HD_total = None if result.group(1) is None else parseInt(result.group(1))
     HD_blocks_map = {}
     for HD_block in HD_blocks:
-        result2 = re.search(r'^(\d+)d(\d+)', HD_block)
+        result2 = regexes.search(r'^(\d+)d(\d+)', HD_block)
         soft_assert(not result2 is None, f"Broken HD block '{HD_block}' in {url}")
         die = parseInt(result2.group(2))
         if not die in HD_blocks_map:  # Sometimes same-size HDs from different sources are combined (Eye of Lamashtu) and sometimes not (Centaur Charger)
@@ -605,6 +796,7 @@ def parsePage(html, url):
     i += 1
     skipBr()
 
+    profiler.section("saves")
     # Get saves
     pageObject["saves"] = {}
     for save in ["Fort", "Ref", "Will"]:
@@ -613,7 +805,7 @@ def parsePage(html, url):
         soft_assert(isinstance(e[i], NavigableString), url)
         s = cleanS(e[i], trailingChar=',')
         i += 1
-        result = re.search(r'^([+-]?\s*\d+)\s*(?:\((.+?)\))?\s*(?:;\s+)?(.+?)?$', s)
+        result = regexes.search(r'^([+-]?\s*\d+)\s*(?:\((.+?)\))?\s*(?:;\s+)?(.+?)?$', s)
         soft_assert(not result is None, save + " Save Regex failed for " + url + "\tInput: |" + s + "|")
         pageObject["saves"][save.lower()] = parseInt(result.group(1))
         if not result.group(2) is None:
@@ -626,11 +818,13 @@ def parsePage(html, url):
             pageObject["saves"]["other"] = result.group(3).strip()
     skipBr(optional=True)
 
+    profiler.section("defensive abilities")
     # Get defensive abilities if present
     if e[i].name == "b" and e[i].get_text() == "Defensive Abilities":
         i += 1
         pageObject["defensive_abilities"] = splitP(handleAsterisk(cleanS(collectText(["b", "br", "h3"]))))
 
+    profiler.section("DR")
     # Get DR if present
     if e[i].name == "b" and e[i].get_text() == "DR":
         i += 1
@@ -640,7 +834,7 @@ def parsePage(html, url):
         for entry in entries:
             entry = entry.strip()
             entrydict = {}
-            result = re.search(r'^(\d+)/\s*(.+?)\s*(?:\((?:(?:(.+?), )?(\d+) (?:hp|hit points|points)|(.+?))?\))?$', entry)
+            result = regexes.search(r'^(\d+)/\s*(.+?)\s*(?:\((?:(?:(.+?), )?(\d+) (?:hp|hit points|points)|(.+?))?\))?$', entry)
             soft_assert(not result is None, url + " |" + entry + "|")
             entrydict["amount"] = parseInt(result.group(1))
             entrydict["weakness"] = result.group(2)
@@ -652,11 +846,13 @@ def parsePage(html, url):
                 entrydict["other"] = result.group(5)
             pageObject["DR"].append(entrydict)
 
+    profiler.section("immunities")
     # Get immunities if present
     if e[i].name == "b" and e[i].get_text() == "Immune":
         i += 1
         pageObject["immunities"] = splitP(cleanS(collectText(["h3", "br", "b"])).strip(), handleAnd=True)
 
+    profiler.section("resistances")
     # Get resistances if present
     if e[i].name == "b" and e[i].get_text() == "Resist":
         i += 1
@@ -665,7 +861,7 @@ def parsePage(html, url):
         pageObject["resistances"] = {}
 
         # Special case: First Blade, ability in the Resist section
-        result = re.search(r'^(.+); (.+)$', s)
+        result = regexes.search(r'^(.+); (.+)$', s)
         if not result is None:
             pageObject["resistances"]["_ability"] = result.group(2).strip()
             s = result.group(1).strip()
@@ -677,7 +873,7 @@ def parsePage(html, url):
         entries = splitP(s, sep=r'(?:,?\s+and\s+|,)')
         for entry in entries:
             entry = entry.strip()  # Handles strange whitespace in cases like Black Magga (probably caused by \r handling)
-            result = re.search(r'^(.+?)\s+(\d+)(?:\s*\((.+?)\))?$', entry)
+            result = regexes.search(r'^(.+?)\s+(\d+)(?:\s*\((.+?)\))?$', entry)
             if result is None:  # Custom resistances, e.g. The Whispering Tyrant
                 pageObject["resistances"][entry] = True
             else:
@@ -685,6 +881,7 @@ def parsePage(html, url):
                 if not result.group(3) is None:
                     pageObject["resistances"][result.group(1).lower() + "_other"] = result.group(3).strip()
 
+    profiler.section("SR")
     # Get SR if present
     if e[i].name == "b" and e[i].get_text() == "SR":
         i += 1
@@ -694,11 +891,13 @@ def parsePage(html, url):
 
     skipBr(optional=True)
 
+    profiler.section("weaknesses")
     # Get weaknesses if present
     if e[i].name == "b" and e[i].get_text() == "Weaknesses":
         i += 1
         pageObject["weaknesses"] = splitP(collectText(["h3"]).strip())  # Skip leading space
 
+    profiler.section("speed")
     # OFFENSE
     soft_assert(e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Offense", url)
     i += 1
@@ -708,13 +907,13 @@ def parsePage(html, url):
     i += 1
     s = collectText(["br"])
     # Handle entries like Solar that have one set of speeds normally and another in armor
-    parts = re.split(r'; (?![^()]*\))', s)  # Use a special split to avoid splitting on semicolons inside parens
+    parts = regexes.split(r'; (?![^()]*\))', s)  # Use a special split to avoid splitting on semicolons inside parens
     soft_assert(len(parts) <= 2, url)
     s = parts[0]
     entries = splitP(s)
     pageObject["speeds"] = {}
     for j, entry in enumerate(entries):
-        result = re.search(r'^\s*(?:(.+?)\s+)?(\d+)\s*ft\s*\.\s*(?:\((.+?)\))?$', entry.strip())
+        result = regexes.search(r'^\s*(?:(.+?)\s+)?(\d+)\s*ft\s*\.\s*(?:\((.+?)\))?$', entry.strip())
         if not result is None:
             t = result.group(1)
             if j != 0:
@@ -740,6 +939,7 @@ def parsePage(html, url):
 
     skipBr()
 
+    profiler.section("attacks")
     # Get melee and ranged attacks if present
     pageObject["attacks"] = {}
     for attack_type in ["Melee", "Ranged"]:
@@ -753,7 +953,7 @@ def parsePage(html, url):
 
             # Special case: Formless Spawn, trailing comma in melee attack
             if attack_type == "Melee" and pageObject["title2"] == "Formless Spawn":
-                s = re.sub(r",$", "", s)
+                s = regexes.sub(r",$", "", s)
 
             key = attack_type.lower()
             pageObject["attacks"][key] = []
@@ -770,7 +970,7 @@ def parsePage(html, url):
                     attack_dict = {"text": entry, "entries": []}
 
                     # First, process the body and separate the parenthetical
-                    result = re.search(r'^(\d+(?:d\d+(?:[+-]\d+)?)?)?\s*(.*?)\s*((?:[+-]\d+/)*[+-]\d+)?(?:\s+(?:(?:melee|ranged|(incorporeal))\s+)?(touch)?(?: attack)?)?\s*(?:\(([^)]+)\)\s*(?:\(([^)]+)\)| plus (.+?))?)?$', entry)
+                    result = attack_regex.search(entry)
                     soft_assert(not result is None, "Attack Regex failed for " + url + " |" + entry + "|")
                     if not result.group(1) is None:
                         attack_dict["count"] = parseInt(result.group(1), stringIfFail=True)
@@ -796,18 +996,14 @@ def parsePage(html, url):
                     def parseCritBlock(s, pure=False):
                         # Special case: crit block at the end after comma, happens in Deadfall Tracker and Devotee of the Ravener King
                         if pure:
-                            result = re.search(r'^(.+?),\s?(\d+ *- *\d+)$', s)
+                            result = crit_block_comma_regex.search(s)
                             if not result is None:
                                 return result.group(1).strip(), result.group(2), None, None
 
                         crit_range = None
                         crit_multiplier = None
                         post = None
-                        regex = r'^(.*?)/(?:(\d+ *- *\d+)(?:/\s*[×x] *(\d))?|[×x] *(\d)) *'
-                        if not pure:
-                            regex += r'(?: (?!/)(.+?))?'
-                        regex += r'$'
-                        result = re.search(regex, s)
+                        result = (crit_block_pure_regex if pure else crit_block_regex).search(s)
                         if not result is None:
                             crit_range = result.group(2)
                             crit_multiplier = result.group(3) if not result.group(3) is None else result.group(4)
@@ -824,13 +1020,13 @@ def parsePage(html, url):
 
                         # Special case: Death Worm Leviathan has "touch" inside parens
                         if pageObject["title2"] == "Death Worm Leviathan":
-                            result = re.search(r'^touch (.+)$', p)
+                            result = regexes.search(r'^touch (.+)$', p)
                             if not result is None:
                                 p = result.group(1).strip()
                                 attack_dict["touch"] = True
                         # Special case: Clockwork Assassin's attack might deal damage or might just be smoke
                         if pageObject["title2"] == "Clockwork Assassin":
-                            result = re.search(r'^(.+?) \((.+?) or (.+?)\)$', entry)
+                            result = regexes.search(r'^(.+?) \((.+?) or (.+?)\)$', entry)
                             if not result is None:
                                 p = result.group(2).strip()
                                 groups.append(result.group(1).strip() + " (" + result.group(3).strip() + ")")
@@ -847,7 +1043,7 @@ def parsePage(html, url):
                         if pageObject["title2"] == "Wereboar (Hybrid Form)":
                             separators.append(r'/(?=\D)')
                         # Special case: we don't split on commas in "acid, cold, electricity, or fire damage" in Zhyen, and "push, 10 ft." in Panotti
-                        if re.search(r', or |push, \d+ ft', p) is None:
+                        if regexes.search(r', or |push, \d+ ft', p) is None:
                             separators.append(r',\s+')
                         pentries = splitP(p, sep=r'(?:' + r'|'.join(separators) + r')')
 
@@ -861,7 +1057,7 @@ def parsePage(html, url):
                             attack_list.append(entrydict)
 
                             # Check if this is a damage entry
-                            result = re.search(r'^((?:\d+d\d+|[\d.]+)(?: *[+-] *(?:\d+d\d+|[\d.]+))*(?:/(?:\d+d\d+[+-]\d+))?(?: per .+?(?=/))?)(.*?)(?: *vs\. (.+?))?$', pentry)  # Special cases in this regex: periods allowed in attack damage for Frost Giant Hunter, "per" syntax for Thorny, vs. see below, slash for Forge Rider and Criminal (Street Thug)
+                            result = attack_damage_regex.search(pentry)
                             if not result is None:
                                 entrydict["damage"] = result.group(1)
                                 leftover = ""
@@ -890,7 +1086,7 @@ def parsePage(html, url):
                                 continue
 
                             # Rare syntax: reversed bleed damage, e.g. "bleed 1d4" in Wolpertinger
-                            result = re.search(r'^bleed (\d+(?:d\d+)?)', pentry)
+                            result = regexes.search(r'^bleed (\d+(?:d\d+)?)', pentry)
                             if not result is None:
                                 entrydict["damage"] = result.group(1)
                                 entrydict["type"] = "bleed"
@@ -907,11 +1103,12 @@ def parsePage(html, url):
 
                 pageObject["attacks"][key].append(group_list)
 
+    profiler.section("space and reach")
     # Get space if present
     if e[i].name == "b" and e[i].get_text() == "Space":
         i += 1
         soft_assert(isinstance(e[i], NavigableString), url)
-        result = re.search(r'^(?:(\d+)|(2\s*-?\s*1/2)|(1/2))\s*(?:ft\.?|feet)$', cleanS(e[i], ",").strip())
+        result = regexes.search(r'^(?:(\d+)|(2\s*-?\s*1/2)|(1/2))\s*(?:ft\.?|feet)$', cleanS(e[i], ",").strip())
         soft_assert(not result is None, "Space Regex failed for " + url)
         if not result.group(2) is None:
             pageObject["space"] = 2.5
@@ -926,7 +1123,7 @@ def parsePage(html, url):
         i += 1
         soft_assert(isinstance(e[i], NavigableString), url)
 
-        result = re.search(r'^(?:(\d+)|(2\s*-?\s*1/2)|(1/2))\s*(?:ft\.?|feet)(?:\s*\(?([^)]+)\)?)?$', cleanS(e[i], ",").strip())
+        result = regexes.search(r'^(?:(\d+)|(2\s*-?\s*1/2)|(1/2))\s*(?:ft\.?|feet)(?:\s*\(?([^)]+)\)?)?$', cleanS(e[i], ",").strip())
         soft_assert(not result is None, "Reach Regex failed for " + url)
         if not result.group(2) is None:
             pageObject["reach"] = 2.5
@@ -938,6 +1135,7 @@ def parsePage(html, url):
             pageObject["reach_other"] = result.group(4).strip()
         i += 1
 
+    profiler.section("special attacks")
     # Skip br if present
     skipBr(optional=True)
 
@@ -947,18 +1145,19 @@ def parsePage(html, url):
         pageObject["attacks"]["special"] = [x.strip() for x in splitP(handleAsterisk(collectText(["h3", "br"]).strip()))]
         skipBr(optional=True)
 
+    profiler.section("spells")
     # Handle all spell-related blocks, including spells, spell-like abilities, and more
     while True:
         if e[i].name == "b" and ("Spells" in e[i].get_text() or "Extracts" in e[i].get_text()):
             key = "spells"
-            result = re.search(r'^(?:([\w ]+) )?(?:Spells|Extracts) (Prepared|Known)$', e[i].get_text().strip())
+            result = regexes.search(r'^(?:([\w ]+) )?(?:Spells|Extracts) (Prepared|Known)$', e[i].get_text().strip())
             soft_assert(not result is None, "Spell Class Regex failed for " + url)
             source = result.group(1)
             spell_type = result.group(2).lower()
             if source is None:
                 # If no class was listed, but we have only one class, use that one
                 if "classes" in pageObject and pageObject["classes"] is not None and len(pageObject["classes"]) == 1:
-                    result = re.search(r'^(.+?)\s+\d+$', pageObject["classes"][0].strip())
+                    result = regexes.search(r'^(.+?)\s+\d+$', pageObject["classes"][0].strip())
                     if not result is None:
                         source = result.group(1).title()
                 else:  # No idea. e.g. Noble (Knight), where the spells are Paladin spells, but he also has the Aristocrat class
@@ -994,13 +1193,13 @@ def parsePage(html, url):
 
             soft_assert(isinstance(e[i], NavigableString), url)
 
-            result = re.search(r'^\((.+)\)$', e[i].strip())
+            result = regexes.search(r'^\((.+)\)$', e[i].strip())
             soft_assert(not result is None, f'Spell-Related Header Base Regex failed for "{e[i].strip()}" in {url}')
             entries = splitP(result.group(1).strip(), sep=r'[;,]')  # Handles corrupted formatting for , instead of ; like in Ice Mage
             i += 1
 
             # The CL should always be there
-            result = re.search(r'^(?:CL|caster level)\s+(\d+)(?:\w{2})?$', entries.pop(0), re.IGNORECASE)  # Ignore case for Nochlean
+            result = regexes.search(r'^(?:CL|caster level)\s+(\d+)(?:\w{2})?$', entries.pop(0), re.IGNORECASE)  # Ignore case for Nochlean
             soft_assert(not result is None, "Spell-Related Header CL Regex failed for " + url)
             if (not result is None and  len(result.groups()) > 1):
                 sourcedict["CL"] = parseInt(result.group(1))
@@ -1010,13 +1209,13 @@ def parsePage(html, url):
                 entry = entry.strip()
 
                 # Concentration
-                result = re.search(r'^conc(?:entration|\.):?\s+([+-]\d+)$', entry, re.IGNORECASE)  # Concentration colon for Executioner Devil (Munagola)
+                result = regexes.search(r'^conc(?:entration|\.):?\s+([+-]\d+)$', entry, re.IGNORECASE)  # Concentration colon for Executioner Devil (Munagola)
                 if not result is None:
                     sourcedict["concentration"] = parseInt(result.group(1))
                     continue
 
                 # Arcane spell failure
-                result = re.search(r'^(?:(?:(\d+%) (?:arcane )?spell failure(?: chance)?)|(?:arcane )?spell failure(?: chance)? (\d+%))$', entry, re.IGNORECASE)
+                result = regexes.search(r'^(?:(?:(\d+%) (?:arcane )?spell failure(?: chance)?)|(?:arcane )?spell failure(?: chance)? (\d+%))$', entry, re.IGNORECASE)
                 if not result is None:
                     if result.group(1) is not None:  # There are two capture groups that might capture the failure chance
                         sourcedict["failure_chance"] = result.group(1)
@@ -1025,13 +1224,13 @@ def parsePage(html, url):
                     continue
 
                 # Save DC ability score
-                result = re.search(r'^(?:save DCs are )?(\w+)-based$', entry, re.IGNORECASE)
+                result = regexes.search(r'^(?:save DCs are )?(\w+)-based$', entry, re.IGNORECASE)
                 if not result is None:
                     sourcedict["DC_ability_score"] = result.group(1)
                     continue
 
                 # Ranged touch attack modifier (present on Vampire and some 3.5 entries)
-                result = re.search(r'^([+-]\d+) (ranged|touch|ranged touch)?$', entry, re.IGNORECASE)
+                result = regexes.search(r'^([+-]\d+) (ranged|touch|ranged touch)?$', entry, re.IGNORECASE)
                 if not result is None:
                     if result.group(2) == "touch":
                         sourcedict["touch_attack_melee"] = parseInt(result.group(1))
@@ -1055,7 +1254,7 @@ def parsePage(html, url):
 
                 # Line regex
                 if key == "spells":
-                    result = re.search(r'^(\d+)(?:\w{2})?\s*(?:\((?:(at[ -]will)|(\d+)(?:/day(?:, (\d+) remaining)?)?)\))?\s*(-)(?![^()]*\))', s, re.IGNORECASE)  # Make sure not to get a dash inside parens e.g. Young Occult Dragon
+                    result = regexes.search(r'^(\d+)(?:\w{2})?\s*(?:\((?:(at[ -]will)|(\d+)(?:/day(?:, (\d+) remaining)?)?)\))?\s*(-)(?![^()]*\))', s, re.IGNORECASE)  # Make sure not to get a dash inside parens e.g. Young Occult Dragon
                     soft_assert(not result is None, f'Spell line regex failed for "{s}" in {url}')
 
                     level = parseInt(result.group(1))
@@ -1079,7 +1278,7 @@ def parsePage(html, url):
                 else:
                     # Special case: Elder Sphinx, Gynosphinx, and Akilep Lady of Stone
                     is_symbol_special = False
-                    result = re.search(r'^(.+?-)any (.+?) of the following: (.+?); all symbols last for (.+?) maximum$', s, re.IGNORECASE)
+                    result = regexes.search(r'^(.+?-)any (.+?) of the following: (.+?); all symbols last for (.+?) maximum$', s, re.IGNORECASE)
                     if not result is None:
                         pageObject[key]["symbols_special"] = {
                             "max_duration": result.group(4),
@@ -1088,7 +1287,7 @@ def parsePage(html, url):
                         s = result.group(1) + result.group(3)
                         is_symbol_special = True
 
-                    result = re.search(r'^([^-]*?at-will[^-]*?|.+?)\s*-\s*(.+)$', s, re.IGNORECASE)  # Specially allow at-will before dash like in Kasa-obake
+                    result = regexes.search(r'^([^-]*?at-will[^-]*?|.+?)\s*-\s*(.+)$', s, re.IGNORECASE)  # Specially allow at-will before dash like in Kasa-obake
                     soft_assert(not result is None, url + " |" + s + "|")
 
                     freq = result.group(1)
@@ -1100,7 +1299,7 @@ def parsePage(html, url):
 
                     # Handle superscripts
                     regex = r'(<sup>(.+?)</sup>)'
-                    result = re.search(regex, entry)
+                    result = regexes.search(regex, entry)
                     while not result is None:
                         s = result.group(2).strip()
                         entry = (entry[:result.start(1)] + entry[result.end(1):]).strip()  # Strip out the superscript
@@ -1114,7 +1313,7 @@ def parsePage(html, url):
                             if not "superscripts" in entrydict:
                                 entrydict["superscripts"] = []
                             entrydict["superscripts"].append(s)
-                        result = re.search(regex, entry)  # repeat regex to look for next <sup>
+                        result = regexes.search(regex, entry)  # repeat regex to look for next <sup>
 
                     # Finish symbol special case handling from before
                     if key == "spell_like_abilities" and is_symbol_special:
@@ -1122,7 +1321,7 @@ def parsePage(html, url):
 
                     # Some entries have double-parenthetical, e.g. Solar
                     # And some have more than one spell in a single entry, e.g. Kasa-obake
-                    result = re.search(r'^([^)(]+?)\s*(?:\(([^)]+)\))?\s*(?:\(([^)]+)\))?(?:,(.*))?$', entry)  
+                    result = regexes.search(r'^([^)(]+?)\s*(?:\(([^)]+)\))?\s*(?:\(([^)]+)\))?(?:,(.*))?$', entry)  
                     soft_assert(not result is None, "Single Spell or Spell-Like Ability Regex failed for " + url + " |" + entry + "|")
                     if (result is None):
                         continue
@@ -1185,7 +1384,7 @@ def parsePage(html, url):
                     # startswith summon to account for stuff like "summon bees" in Thriae Seer, startswith level to dodge things like Summon Monster
                     if key == "spell_like_abilities" and not parenthetical is None and entrydict["name"].lower().startswith("summon") and parenthetical.startswith("level "):  
                         soft_assert(parenthetical2 is None, url + " |" + ( "" if parenthetical2 is None else parenthetical2 ) + "|")
-                        result = re.search(r'^level (\d+),\s?(.+)$', parenthetical)
+                        result = regexes.search(r'^level (\d+),\s?(.+)$', parenthetical)
                         soft_assert(not result is None, "Summon Spell-Like Ability Regex failed for " + url + " |" + parenthetical + "|")
                         entrydict["level"] = parseInt(result.group(1))
                         entrydict["summons"] = []
@@ -1193,14 +1392,14 @@ def parsePage(html, url):
 
                         # Check for percentage-at-end format, e.g. Accuser Devil (Zebub)
                         commonChance = None
-                        result = re.search(r'^(.+?), (\d+%)$', s)
+                        result = regexes.search(r'^(.+?), (\d+%)$', s)
                         if not result is None:
                             s = result.group(1).strip()
                             commonChance = result.group(2)
 
                         pentries = splitP(s, sep="(?:,? or|,)")
                         for pentry in pentries:
-                            result = re.search(r'^(?:(\d+(?:d\d+)?) )?(.+?)(?: (\d+%))?$', pentry.strip())
+                            result = regexes.search(r'^(?:(\d+(?:d\d+)?) )?(.+?)(?: (\d+%))?$', pentry.strip())
                             soft_assert(not result is None, "Summon Spell-Like Ability Entry Regex failed for " + url + " |" + s + "|")
                             summondict = {"name": result.group(2).strip()}
                             if not result.group(1) is None:
@@ -1220,7 +1419,7 @@ def parsePage(html, url):
                         for pentry in pentries:
                             pentry = pentry.strip()
 
-                            result = re.search(r'^DC\s+(\d+)$', pentry)
+                            result = regexes.search(r'^DC\s+(\d+)$', pentry)
                             if not result is None:
                                 if "DC" in entrydict:
                                     giveup = True
@@ -1236,7 +1435,7 @@ def parsePage(html, url):
                                     entrydict["count"] = parseInt(pentry)
                                     continue
                             else:
-                                result = re.search(r'^CL (\d+)(?:\w{2})?$', pentry)
+                                result = regexes.search(r'^CL (\d+)(?:\w{2})?$', pentry)
                                 if not result is None:
                                     if "CL" in entrydict:
                                         giveup = True
@@ -1342,19 +1541,19 @@ def parsePage(html, url):
             soft_assert(not key in pageObject, url)
             pageObject[key] = {}
             while isinstance(e[i], NavigableString):
-                result = re.search(r'^(.+?)\s*-\s*(.+)$', collectText(["h3", "br"]).strip())
+                result = regexes.search(r'^(.+?)\s*-\s*(.+)$', collectText(["h3", "br"]).strip())
                 soft_assert(not result is None, "Kineticist Wild Talent Line Regex failed for " + url)
                 pageObject[key][result.group(1)] = splitP(result.group(2))
                 skipBr(optional=True)
 
         elif key == "psychic_magic":
-            result = re.search(r'^(.+?)\s*-\s*(.+)$', collectText(["h3", "br"], skip=[], mark=["sup"]).strip())
+            result = regexes.search(r'^(.+?)\s*-\s*(.+)$', collectText(["h3", "br"], skip=[], mark=["sup"]).strip())
             soft_assert(not result is None, "Psychic Magic Line Regex failed for " + url)
 
             pageObject["psychic_magic"]["PE"] = result.group(1)
 
             # Numericize PE if possible
-            if re.search(r'^(\d+) PE$', pageObject["psychic_magic"]["PE"]) is not None:
+            if regexes.search(r'^(\d+) PE$', pageObject["psychic_magic"]["PE"]) is not None:
                 pageObject["psychic_magic"]["PE"] = parseInt(pageObject["psychic_magic"]["PE"][:-3])
 
             # Parse spells
@@ -1364,7 +1563,7 @@ def parsePage(html, url):
 
                 # Handle superscripts
                 regex = r'(<sup>(.+?)</sup>)'
-                result = re.search(regex, entry)
+                result = regexes.search(regex, entry)
                 while not result is None:
                     s = result.group(2).strip()
                     entry = entry[:result.start(1)] + entry[result.end(1):]  # Strip out all superscripts
@@ -1372,9 +1571,9 @@ def parsePage(html, url):
                     if not "superscripts" in entrydict:
                         entrydict["superscripts"] = []
                     entrydict["superscripts"].append(s)
-                    result = re.search(regex, entry)  # repeat regex to look for next <sup>
+                    result = regexes.search(regex, entry)  # repeat regex to look for next <sup>
 
-                result = re.search(r'^(.+?)\s*(?:\(([^)]+)\))?$', entry)
+                result = regexes.search(r'^(.+?)\s*(?:\(([^)]+)\))?$', entry)
                 soft_assert(not result is None, "Psychic Magic Spell Regex failed for " + url)
                 entrydict["name"] = result.group(1)
                 if not result.group(2) is None:
@@ -1406,7 +1605,7 @@ def parsePage(html, url):
                 skipBr(optional=True)
                 entrydict = {}
 
-                result = re.search(r'^(.+?) \((.+?), (\d+) points\)-Resonant (.+); Focus (.+)$', s, re.IGNORECASE)
+                result = regexes.search(r'^(.+?) \((.+?), (\d+) points\)-Resonant (.+); Focus (.+)$', s, re.IGNORECASE)
                 soft_assert(not result is None, url + " |" + s + "|")
                 entrydict["school"] = result.group(1).strip()
                 entrydict["slot"] = result.group(2).strip()
@@ -1419,6 +1618,7 @@ def parsePage(html, url):
         if key != "kineticist_wild_talents":
             pageObject[key]["sources"].append(sourcedict)
 
+    profiler.section("tactics")
     # TACTICS if present
     if e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Tactics":
         pageObject["tactics"] = {}
@@ -1434,6 +1634,7 @@ def parsePage(html, url):
             if isinstance(e[i], NavigableString) and e[i].strip() == "":  # Handle the odd phantom spacing, like in Lastwall Border Scout
                 i += 1
 
+    profiler.section("ability scores")
     # STATISTICS
     soft_assert(e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Statistics", url)
     i += 1
@@ -1463,6 +1664,7 @@ def parsePage(html, url):
     #     con_mod = int((pageObject["ability_scores"]["CON"] - 10) / 2)
     #     pageObject["HP"]["bonus_HP_normal"] = pageObject["HP"]["bonus_HP"] == pageObject["HP"]["HD"]["num"] * con_mod
 
+    profiler.section("BAB, CMB and CMD")
     # Get BAB, CMB, and CMD
     soft_assert(e[i].name == "b" and e[i].get_text() == "Base Atk", url)
     i += 1
@@ -1471,7 +1673,7 @@ def parsePage(html, url):
         soft_assert(e[i].name == "b" and e[i].get_text() == "CMB", url)
         i += 1
         x = cleanS(collectText(["b"])).strip()
-        result = re.search(r'^(-|[+-]?\d+)(?:\s*\(([^)]+)\))?$', x)
+        result = regexes.search(r'^(-|[+-]?\d+)(?:\s*\(([^)]+)\))?$', x)
         soft_assert(not result is None, "CMB Regex failed for " + url)
         if result.group(1) == "-":
             pageObject["CMB"] = None
@@ -1481,7 +1683,7 @@ def parsePage(html, url):
             pageObject["CMB_other"] = result.group(2).strip()
         soft_assert(e[i].name == "b" and e[i].get_text() == "CMD", url)
         i += 1
-        result = re.search(r'^(-|[+-]?\d+)(?:\s*\(([^)]+)\))?$', cleanS(collectText(["br", "h1", "h2", "h3"])).strip())
+        result = regexes.search(r'^(-|[+-]?\d+)(?:\s*\(([^)]+)\))?$', cleanS(collectText(["br", "h1", "h2", "h3"])).strip())
         soft_assert(not result is None, "CMD Regex failed for " + url)
         if result.group(1) == "-":
             pageObject["CMD"] = None
@@ -1496,6 +1698,7 @@ def parsePage(html, url):
         pageObject["grapple_3.5"] = parseInt(collectText(["br", "b", "h3", "h2", "h1"]), stringIfFail=True)
         skipBr(optional=True)
 
+    profiler.section("feats")
     # Get feats if present
     if e[i].name == "b" and e[i].get_text() == "Feats":
         i += 1
@@ -1519,7 +1722,7 @@ def parsePage(html, url):
 
             # First, handle all superscripts
             regex = r'(<sup>(.+?)</sup>)'
-            result = re.search(regex, entry)
+            result = regexes.search(regex, entry)
             while not result is None:
                 s = result.group(2).strip()
                 entry = entry[:result.start(1)] + entry[result.end(1):]  # Strip out all superscripts
@@ -1532,9 +1735,9 @@ def parsePage(html, url):
                     if not "superscripts" in entrydict:
                         entrydict["superscripts"] = []
                     entrydict["superscripts"].append(s)
-                result = re.search(regex, entry)  # repeat regex to look for next <sup>
+                result = regexes.search(regex, entry)  # repeat regex to look for next <sup>
 
-            result = re.search(r"^(.+?)(?: \((.+?)\))?$", entry)
+            result = regexes.search(r"^(.+?)(?: \((.+?)\))?$", entry)
             soft_assert(not result is None, "Feats Regex failed for " + url)
             if result.group(2) is None:
                 entrylist = [result.group(1)]
@@ -1547,6 +1750,7 @@ def parsePage(html, url):
                 pageObject["feats"].append(subentrydict)
         skipBr(optional=True)
 
+    profiler.section("skills")
     # Get skills if present
     pageObject["skills"] = {}
     if e[i].name == "b" and e[i].get_text() == "Skills":
@@ -1555,7 +1759,7 @@ def parsePage(html, url):
 
         # Check for racial modifiers
         s_racial = None
-        result = re.search(r"^(.+?);?\s*Racial +Modifiers?\s*(.+?)$", s)
+        result = regexes.search(r"^(.+?);?\s*Racial +Modifiers?\s*(.+?)$", s)
         if not result is None:
             s = result.group(1).strip()
             s_racial = result.group(2).strip()
@@ -1599,7 +1803,7 @@ def parsePage(html, url):
                     return {entry: {"_": None}}
 
                 # The only allowed format for skills and a rare format for racial mods, e.g. "Acrobatics +13 (+17 when jumping)"
-                result = re.search(r'^(' + skillRegex + r')\s+([+-]\d+)(?:\s+\((.+?)\))?$', entry)
+                result = regexes.search(r'^(' + skillRegex + r')\s+([+-]\d+)(?:\s+\((.+?)\))?$', entry)
 
                 #if t == "skill":
                 #    soft_assert(not result is None, url + " |" + entry + "|")
@@ -1611,7 +1815,7 @@ def parsePage(html, url):
                         pentries = splitP(result.group(3).strip())
                         for pentry in pentries:
                             pentry = pentry.strip()
-                            result = re.search(r'^([+-]\d+) (.+)$', pentry)
+                            result = regexes.search(r'^([+-]\d+) (.+)$', pentry)
                             if not result is None:
                                 bonus = parseInt(result.group(1))
                                 category = result.group(2).strip()
@@ -1624,7 +1828,7 @@ def parsePage(html, url):
                     return out
 
                 # Rare format, and-based e.g. "+2 Perception and +2 Stealth in dim light or darkness" or "+4 Stealth and Survival in deserts" (must be checked before the common format because that one catches these examples)
-                result = re.search(r'^([+-]\d+)\s+(' + skillRegex + r') and (?:([+-]\d+)\s+)?(' + skillRegex + r')\s+(.+?)$', entry)
+                result = regexes.search(r'^([+-]\d+)\s+(' + skillRegex + r') and (?:([+-]\d+)\s+)?(' + skillRegex + r')\s+(.+?)$', entry)
                 if not result is None:
                     bonus1 = parseInt(result.group(1))
                     skill1 = result.group(2).strip()
@@ -1638,7 +1842,7 @@ def parsePage(html, url):
                     return {skill1: {category: bonus1}, skill2: {category: bonus2}}
 
                 # The most common format by far for racial mods - bonus first, e.g. "+2 Perception", "+8 Stealth (+16 in forests)", "+4 Diplomacy when influencing rats", or "+4 Stealth in dim light (–4 in bright light)"
-                result = re.search(r'^([+-]\d+)\s+(?:on )?(' + skillRegex + r')(?:(?:(?:\s+(.+?))?\s+\((?:improves to )?([+-]\d+\s+[^)]+?)\))|\s+(.+?))?$', entry)  # Special case in regex: Pseudodragon (ignore "improves to")
+                result = regexes.search(r'^([+-]\d+)\s+(?:on )?(' + skillRegex + r')(?:(?:(?:\s+(.+?))?\s+\((?:improves to )?([+-]\d+\s+[^)]+?)\))|\s+(.+?))?$', entry)  # Special case in regex: Pseudodragon (ignore "improves to")
                 if not result is None:
                     bonus = parseInt(result.group(1))
                     skill = result.group(2).strip()
@@ -1653,20 +1857,20 @@ def parsePage(html, url):
 
                     out = {skill: {category: bonus}}
                     if not paren is None:
-                        for pentry in re.split(r',\s*(?=[+-]\d+)', paren.strip()):
-                            result = re.search(r'^([+-]\d+)\s+(.+?)$', pentry.strip())
+                        for pentry in regexes.split(r',\s*(?=[+-]\d+)', paren.strip()):
+                            result = regexes.search(r'^([+-]\d+)\s+(.+?)$', pentry.strip())
                             pcategory = result.group(2).strip()
                             soft_assert(not pcategory in out[skill], url)
                             out[skill][pcategory] = parseInt(result.group(1))
                     return out
 
                 # Rare format, bonus inside parens e.g. "Acrobatics (+4 when jumping)"
-                result = re.search(r'^(' + skillRegex + r')\s+\(([+-]\d+)\s+([^)]+?)\)$', entry)
+                result = regexes.search(r'^(' + skillRegex + r')\s+\(([+-]\d+)\s+([^)]+?)\)$', entry)
                 if not result is None:
                     return {result.group(1).strip(): {result.group(3).strip(): parseInt(result.group(2))}}
 
                 # Rare format, comma-separated and-based e.g. "+8 Bluff, Diplomacy, Intimidate, and Sense Motive vs. its creator" (currently only present in Tulpa and must be special-cased in the split step below)
-                result = re.search(r'^([+-]\d+)\s+((?:' + skillRegex + r', )+and ' + skillRegex + r')\s+(.+)$', entry)
+                result = regexes.search(r'^([+-]\d+)\s+((?:' + skillRegex + r', )+and ' + skillRegex + r')\s+(.+)$', entry)
                 if not result is None:
                     bonus = parseInt(result.group(1))
                     skills = splitP(result.group(2).strip(), sep=r', (?:and )?')
@@ -1674,7 +1878,7 @@ def parsePage(html, url):
                     return {skill: {category: bonus} for skill in skills}
 
                 # Rare format, e.g. "+8 on vision-based Perception checks"
-                result = re.search(r'^([+-]\d+) (on .+?) (' + skillRegex + r') checks$', entry)
+                result = regexes.search(r'^([+-]\d+) (on .+?) (' + skillRegex + r') checks$', entry)
                 if not result is None:
                     bonus = parseInt(result.group(1))
                     skill = result.group(3).strip()
@@ -1705,7 +1909,7 @@ def parsePage(html, url):
                             del out[skillName][category]
 
                     # Split parenthetical skills like Craft (armorsmithing, blacksmithing, and weaponsmithing)
-                    result = re.search(r'^(.+?) \((.+?)\)$', skillName)
+                    result = regexes.search(r'^(.+?) \((.+?)\)$', skillName)
                     if not result is None:
                         updateDict = {result.group(1) + " (" + t.strip() + ")": deepcopy(out[skillName]) for t in splitP(result.group(2), sep=r"(?:,? and|,? plus|,) +")}
                         del out[skillName]
@@ -1757,6 +1961,7 @@ def parsePage(html, url):
 
         skipBr(optional=True)
 
+    profiler.section("languages")
     # Get languages if present
     if e[i].name == "b" and e[i].get_text() == "Languages":
         i += 1
@@ -1764,12 +1969,14 @@ def parsePage(html, url):
         pageObject["languages"] = [l.strip() for l in pageObject["languages"]]  # Handles strange whitespace in cases like Black Magga (probably caused by \r handling)
         skipBr(optional=True)
 
+    profiler.section("special qualities")
     # Get special qualities if present
     if e[i].name == "b" and e[i].get_text() == "SQ":
         i += 1
         pageObject["special_qualities"] = splitP(handleAsterisk(collectText(["h3", "br"]).strip()))
         skipBr(optional=True)
 
+    profiler.section("gear")
     # Get gear if present (could be Combat Gear, Other Gear, or just Gear)
     for gear_name, gear_string in [("gear", "Gear"), ("combat", "Combat Gear"), ("other", "Other Gear")]:
         if e[i].name == "b" and e[i].get_text() == gear_string:
@@ -1779,6 +1986,7 @@ def parsePage(html, url):
             pageObject["gear"][gear_name] = splitP(handleAsterisk(cleanS(collectText(["h3", "br", "b"]))))
     skipBr(optional=True)
 
+    profiler.section("npc boon")
     # Get npc boon if present
     skipBr(optional=True)
     if e[i].name == "b" and e[i].get_text().strip() == "Boon":
@@ -1788,6 +1996,7 @@ def parsePage(html, url):
         i += 1
         skipBr(optional=True)
 
+    profiler.section("ecology")
     # ECOLOGY if present
     if e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Ecology":
         pageObject["ecology"] = {}
@@ -1808,8 +2017,7 @@ def parsePage(html, url):
         if e[i].name == "b" and e[i].get_text() == "Treasure":
             i += 1
             s = collectText(["h3", "br"]).strip()
-            treasure_types = ['none', 'incidental', 'half', 'standard', 'double', 'triple', 'NPC Gear']
-            result = re.search(r'^(' + "|".join(treasure_types) + r')(?:\s+\((.+?)\))?$', s, re.IGNORECASE)
+            result = treasure_regex.search(s)
             if not result is None:
                 pageObject["ecology"]["treasure_type"] = [x for x in treasure_types if x.lower() == result.group(1).lower()][0]
                 if not result.group(2) is None:
@@ -1828,7 +2036,7 @@ def parsePage(html, url):
                 for entry in entries:
                     entrydict = {}
                     entry = entry.strip()
-                    result = re.search(r'^(\d+)(?:-(\d+)|\+) (?:HD )?\((' + "|".join(sizes) + r')\)$', entry, re.IGNORECASE)
+                    result = advancement_size_regex.search(entry)
                     if not result is None:
                         entrydict = {
                             "type": "size",
@@ -1841,7 +2049,7 @@ def parsePage(html, url):
                         pageObject["ecology"]["advancement_3.5"].append(entrydict)
                         continue
 
-                    result = re.search("^by character class(?:; Favored Class (.+))?$", entry, re.IGNORECASE)
+                    result = regexes.search("^by character class(?:; Favored Class (.+))?$", entry, re.IGNORECASE)
                     if not result is None:
                         entrydict["type"] = "class"
                         if not result.group(1) is None:
@@ -1854,6 +2062,7 @@ def parsePage(html, url):
 
             skipBr(optional=True)
 
+    profiler.section("special abilities")
     # SPECIAL ABILITIES if present
     if e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Special Abilities":
         pageObject["special_abilities"] = {}
@@ -1904,6 +2113,7 @@ def parsePage(html, url):
             # Update page data
             pageObject["special_abilities"][t] = text.strip()
 
+    profiler.section("description")
     # Skip the final DESCRIPTION header if present, as well as any trailing br tags
     if e[i].name == "h3" and e[i]['class'] == ['framing'] and e[i].get_text() == "Description":
         i += 1
@@ -1915,6 +2125,8 @@ def parsePage(html, url):
 
     return pageObject
 
+soft_assert_failures = 0  # Running count, so callers can tell whether a given parse tripped any assertions
+
 def soft_assert(condition, message="Assertion failed"):
     """
     A replacement for assert that logs failures with the actual assertion code
@@ -1926,7 +2138,10 @@ def soft_assert(condition, message="Assertion failed"):
     Returns:
         bool: True if the assertion passed, False if it failed
     """
+    global soft_assert_failures
     if not condition:
+        soft_assert_failures += 1
+
         # Get the caller's frame information
         caller_frame = inspect.currentframe().f_back
         filename = os.path.basename(caller_frame.f_code.co_filename)
@@ -1951,18 +2166,59 @@ def soft_assert(condition, message="Assertion failed"):
         return False
     return True
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        datapath = sys.argv[1]
-    else:
-        datapath = "data/"
+def loadClasses(datapath):
+    global class_hds, classname_map, class_line_regex, class_block_regex
+    with open(os.path.join(datapath, "class_hds.json")) as fp:
+        class_hds = json.load(fp)
+    classname_map = {name.lower(): name for name in class_hds}
+
+    # The class matchers are built from every class name, so build them once here rather than on every page with class levels
+    class_reg = trieRegex(n.lower() for n in class_hds)
+    class_reg_block = fr"{class_reg} (?:of [\w' -]+ )?(?:\([^)]+?\) )?\d+"
+    class_line_regex = regexes.compile(fr"(?:^|\s+){class_reg_block}(?:/{class_reg_block})*$", re.IGNORECASE, name="class levels")
+    class_block_regex = regexes.compile(fr"^({class_reg}) (?:of ([\w' -]+) )?(?:\(([^)]+?)\) )?(\d+)$", re.IGNORECASE, name="class block")
+
+def setHtmlParser(name):
+    """
+    Switch the tree builder parsePage uses, falling back to html.parser if the requested one isn't installed
 
+    Returns:
+        str: The name of the tree builder actually in use
+    """
+    global html_parser
+    try:
+        BeautifulSoup("", name)
+    except FeatureNotFound:
+        print(f"The {name} parser is not installed, falling back to html.parser")
+        name = "html.parser"
+    html_parser = name
+    return name
+
+def setupLogging(datapath):
     logging.basicConfig(
         filename=os.path.join(datapath, 'assertion_failures.log'),
         level=logging.ERROR,
         format='%(asctime)s - %(message)s'
     )
 
+# Worker setup for --jobs mode, so spawned processes get the same globals and logging as the main process
+def initWorker(datapath, parser="html.parser"):
+    global workerDatapath, manifest, corpus
+    workerDatapath = datapath
+    setHtmlParser(parser)
+    manifest = loadManifest(datapath)
+    corpusPath = os.path.join(datapath, CORPUS_FILENAME)
+    corpus = CorpusReader(corpusPath) if os.path.isfile(corpusPath) else None
+    setupLogging(datapath)
+    loadClasses(datapath)
+
+def loadEntries(datapath):
+    """
+    Get the pages to parse, skipping broken and undownloaded urls. Must be called after initWorker
+
+    Returns:
+        list: (index, url) pairs for parseEntry, where index is the position of the url in urls.txt
+    """
     urls = []
     with open(os.path.join(datapath, "urls.txt")) as file:
         for line in file:
@@ -1978,35 +2234,130 @@ if __name__ == "__main__":
             if not line.strip() == "" and not line.strip().startswith("#"):
                 broken_urls.append(line.rstrip())
 
+    # Skip urls pre-marked as broken
+    entries = [(i, url) for i, url in enumerate(urls) if not url in broken_urls]
+
+    # Skip urls whose download failed
+    if manifest is not None:
+        for i, url in entries:
+            if not url in manifest:
+                print("Not downloaded, skipping: " + url)
+        entries = [(i, url) for i, url in entries if url in manifest]
+
+    return entries
+
+def readPage(datapath, i, url):
+    # Pages are found through the download manifest, falling back to the old index-based names for data folders without one
+    if manifest is not None:
+        filename = manifest[url]["file"]
+    else:
+        filename = str(i) + ".html"
+    if filename == CORPUS_FILENAME:
+        return corpus.get(url)
+    with open(os.path.join(datapath, filename), encoding='utf-8') as file:
+        return file.read()
+
+def parseEntry(entry):
+    """
+    Read and parse a single page from the url list
+
+    Args:
+        entry: An (index, url) pair, where index is the position of the url in urls.txt
+
+    Returns:
+        tuple: (url, pageObject, error, clean), where pageObject is None and error holds the printable traceback if parsing failed,
+               and clean is True if the parse raised no soft assertion failures
+    """
+    i, url = entry
+    html = readPage(workerDatapath, i, url)
+
+    failures = soft_assert_failures
+    profiler.startPage(url)
+    try:
+        pageObject = parsePage(html, url)
+    except Exception as e:
+        _, _, tb = sys.exc_info()
+        error = "".join(traceback.format_tb(tb)) + type(e).__name__ + ": " + str(e)
+        profiler.endPage(error)
+        return url, None, error, False
+    profiler.endPage()
+    return url, pageObject, None, soft_assert_failures == failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse the downloaded monster pages into a database.")
+    parser.add_argument("datapath", nargs="?", default="data/", help="folder containing urls.txt, class_hds.json and the downloaded html files")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="number of worker processes to parse with (default 1, 0 for one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="re-parse every page instead of reusing unchanged results from parse_cache.sqlite")
+    parser.add_argument("--parser", default="html.parser", choices=["html.parser", "lxml"], help="BeautifulSoup tree builder to use (lxml is faster but must be installed; check it with compare_parsers.py)")
+    parser.add_argument("--regex-stats", action="store_true", help="time every regex parsePage runs and print the slowest ones at the end (parses every page, in a single process)")
+    parser.add_argument("--no-data-json", action="store_true", help="only write the database to " + NDJSON_FILENAME + ", one monster per line, without building " + JSON_FILENAME + " from it at the end")
+    parser.add_argument("--profile", action="store_true", help="time each section of parsePage on every page, print a report of the slowest sections and pages, and save it to profile.json (parses every page, in a single process)")
+    args = parser.parse_args()
+    if args.regex_stats or args.profile:
+        args.no_cache = True
+        args.jobs = 1
+        regexes.timing = True
+    profiler.enabled = args.profile
+    datapath = args.datapath
+
+    setupLogging(datapath)
+
     if not os.path.exists(os.path.join(datapath, "class_hds.json")):
         print("Run get_classes.py first.")
-    with open(os.path.join(datapath, "class_hds.json")) as fp:
-        class_hds = json.load(fp)
-    classname_map = {name.lower(): name for name in class_hds}
+    initWorker(datapath, args.parser)
+    entries = loadEntries(datapath)
 
-    pageObjects = {}
-    for i, url in enumerate(tqdm(urls)):
-        # Skip urls pre-marked as broken
-        if url in broken_urls:
-            continue
+    # entries = [(i, url) for i, url in entries if url == "https://aonprd.com/MythicMonsterDisplay.aspx?ItemName=Kortash%20Khain"]
 
-        # if url != "https://aonprd.com/MythicMonsterDisplay.aspx?ItemName=Kortash%20Khain":
-        #     continue
+    # Look up every page in the parse cache, so only new or changed pages get parsed
+    cache = None if args.no_cache else ParseCache(os.path.join(datapath, "parse_cache.sqlite"), parserFingerprint(datapath, html_parser))
+    if cache is None:  # Nothing to look up, so don't read and hash every page on top of parsing it
+        plan = [(i, url, None, None) for i, url in entries]
+    else:
+        plan = []
+        for i, url in entries:
+            htmlHash = hashBytes(readPage(datapath, i, url))
+            plan.append((i, url, htmlHash, cache.get(url, htmlHash)))
+    misses = [(i, url) for i, url, _, cached in plan if cached is None]
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    if jobs > 1 and len(misses) > 1:
+        pool = multiprocessing.Pool(jobs, initializer=initWorker, initargs=(datapath, html_parser))
+        results = pool.imap(parseEntry, misses, chunksize=4)  # imap keeps results in url order, so the output matches a serial run
+    else:
+        pool = None
+        results = map(parseEntry, misses)
+
+    # Each monster is written out as soon as it's parsed rather than kept in memory, so a crash keeps everything parsed so far
+    stream = NdjsonWriter(os.path.join(datapath, NDJSON_FILENAME))
+    for i, url, htmlHash, pageObject in tqdm(plan):
+        if pageObject is None:
+            _, pageObject, error, clean = next(results)
+            if error is not None:
+                print(url)
+                print(error)
+                continue
+            # Pages with soft assertion failures are left out of the cache, so their warnings show up again on the next run
+            if cache is not None and clean:
+                cache.put(url, htmlHash, pageObject)
 
-        with open(os.path.join(datapath, str(i) + ".html"), encoding='utf-8') as file:
-            html = file.read()
+        if not include3_5 and "is_3.5" in pageObject:
+            continue
 
-        try:
-            pageObjects[url] = parsePage(html, url)
-        except Exception as e:
-            print(url)
-            # raise e
-            _, _, tb = sys.exc_info()
-            traceback.print_tb(tb)
-            print(type(e).__name__ + ": " + str(e))
-
-        if not include3_5 and "is_3.5" in pageObjects[url]:
-            del pageObjects[url]
-
-    with open(os.path.join(datapath, 'data.json'), 'w') as fp:
-        json.dump(pageObjects, fp)
+        stream.write(url, pageObject)
+    stream.close()
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if cache is not None:
+        cache.close()
+        print(f"Parse cache: {cache.hits} reused, {cache.misses} parsed")
+    if args.regex_stats:
+        print(regexes.report())
+    if args.profile:
+        print(profiler.report())
+        profiler.save(os.path.join(datapath, "profile.json"))
+
+    if not args.no_data_json:
+        buildDataJson(os.path.join(datapath, NDJSON_FILENAME), os.path.join(datapath, JSON_FILENAME))
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+COMMIT_EVERY = 100  # Pages between commits, so a crash partway through a run keeps most of what it parsed
+
+
+def hashBytes(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        h.update(part)
+    return h.hexdigest()
+
+def parserFingerprint(datapath, htmlParser="html.parser"):
+    """
+    Fingerprint everything besides the page itself that affects the output of parsePage
+
+    This is the parser source (main.py, which holds parsePage, its helpers, and all the special cases, plus the
+    regex helpers in patterns.py), the class list, and the BeautifulSoup tree builder. Any change to these
+    invalidates the whole cache.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    source = b""
+    for filename in ["main.py", "patterns.py"]:
+        with open(os.path.join(script_dir, filename), 'rb') as fp:
+            source += fp.read()
+    with open(os.path.join(datapath, "class_hds.json"), 'rb') as fp:
+        classes = fp.read()
+    return hashBytes(source, b"\0", classes, b"\0", htmlParser)
+
+
+class ParseCache:
+    """
+    A persistent cache of parsed page objects, stored in a single sqlite file
+
+    Each url keeps at most one entry, keyed on the hash of its raw html and the parser fingerprint,
+    so the cache never grows past the size of the url list.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.uncommitted = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, html_hash TEXT, fingerprint TEXT, page TEXT)")
+        # Entries from an older parser can never be hit again, so drop them up front
+        self.conn.execute("DELETE FROM pages WHERE fingerprint != ?", (fingerprint,))
+        self.conn.commit()
+
+    def get(self, url, htmlHash):
+        row = self.conn.execute("SELECT page FROM pages WHERE url = ? AND html_hash = ? AND fingerprint = ?", (url, htmlHash, self.fingerprint)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, url, htmlHash, pageObject):
+        self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (url, htmlHash, self.fingerprint, json.dumps(pageObject)))
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_EVERY:
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,162 @@
+import time
+import regex as re
+
+
+def trieRegex(words):
+    """
+    Build a regex that matches any of the given words, with the alternatives arranged as a trie
+
+    The engine then follows one branch per character instead of trying every word in turn. Longer words are
+    tried before their prefixes, so it matches the same way as an alternation of the words sorted longest first.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[""] = None  # Marks the end of a word
+
+    def build(node):
+        branches = [re.escape(c) + build(node[c]) for c in sorted(node) if c != ""]
+        if len(branches) == 0:
+            return ""
+        if "" in node:  # A word ends here, but try to match a longer one first
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return "(?:" + build(trie) + ")"
+
+
+class TrackedPattern:
+    """
+    A compiled pattern that counts how often it is used and matches
+
+    If its registry has timing turned on, it also adds up the time spent running it.
+    """
+
+    __slots__ = ("registry", "pattern", "flags", "name", "compiled", "calls", "matches", "seconds")
+
+    def __init__(self, registry, pattern, flags=0, name=None):
+        self.registry = registry
+        self.pattern = pattern
+        self.flags = flags
+        self.name = name
+        self.compiled = re.compile(pattern, flags)
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+
+    def search(self, string):
+        self.calls += 1
+        if self.registry.timing:
+            t = time.perf_counter()
+            result = self.compiled.search(string)
+            t = time.perf_counter() - t
+            self.seconds += t
+            self.registry.seconds += t
+        else:
+            result = self.compiled.search(string)
+        if result is not None:
+            self.matches += 1
+        return result
+
+    def sub(self, repl, string):
+        self.calls += 1
+        if self.registry.timing:
+            t = time.perf_counter()
+            result, n = self.compiled.subn(repl, string)
+            t = time.perf_counter() - t
+            self.seconds += t
+            self.registry.seconds += t
+        else:
+            result, n = self.compiled.subn(repl, string)
+        if n > 0:
+            self.matches += 1
+        return result
+
+    def split(self, string):
+        self.calls += 1
+        if self.registry.timing:
+            t = time.perf_counter()
+            result = self.compiled.split(string)
+            t = time.perf_counter() - t
+            self.seconds += t
+            self.registry.seconds += t
+        else:
+            result = self.compiled.split(string)
+        if len(result) > 1:
+            self.matches += 1
+        return result
+
+
+    def finditer(self, string, pos=0):
+        # Counted as a single call. Matching happens lazily as the caller iterates, so it isn't timed
+        self.calls += 1
+        return self.compiled.finditer(string, pos)
+
+
+class PatternRegistry:
+    """
+    A store of compiled patterns, keyed on their source and flags
+
+    Patterns are compiled once and shared by every caller. The search/sub/split helpers mirror the module-level
+    regex functions, so call sites can pass pattern strings and still get compiled, tracked patterns.
+    """
+
+    def __init__(self):
+        self.patterns = {}
+        self.timing = False
+        self.seconds = 0.0  # Total over all patterns, while timing is on
+
+    def compile(self, pattern, flags=0, name=None):
+        key = (pattern, flags)
+        tracked = self.patterns.get(key)
+        if tracked is None:
+            tracked = self.patterns[key] = TrackedPattern(self, pattern, flags, name)
+        elif name is not None and tracked.name is None:
+            tracked.name = name
+        return tracked
+
+    def search(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).search(string)
+
+    def sub(self, pattern, repl, string, flags=0):
+        return self.compile(pattern, flags).sub(repl, string)
+
+    def split(self, pattern, string, flags=0):
+        return self.compile(pattern, flags).split(string)
+
+    def reset(self):
+        self.seconds = 0.0
+        for tracked in self.patterns.values():
+            tracked.calls = 0
+            tracked.matches = 0
+            tracked.seconds = 0.0
+
+    def stats(self):
+        """
+        Returns:
+            list: One dict per pattern that has been used, slowest first (or most used first if timing is off)
+        """
+        out = [{
+            "name": tracked.name,
+            "pattern": tracked.pattern,
+            "calls": tracked.calls,
+            "matches": tracked.matches,
+            "seconds": tracked.seconds
+        } for tracked in self.patterns.values() if tracked.calls > 0]
+        return sorted(out, key=lambda x: (x["seconds"], x["calls"]), reverse=True)
+
+    def report(self, limit=25):
+        lines = [f"{'calls':>9} {'matches':>9} {'total ms':>10} {'us/call':>8}  pattern"]
+        for x in self.stats()[:limit]:
+            label = x["name"] if x["name"] is not None else x["pattern"]
+            if len(label) > 80:
+                label = label[:77] + "..."
+            lines.append(f"{x['calls']:>9} {x['matches']:>9} {x['seconds'] * 1000:>10.1f} {x['seconds'] / x['calls'] * 1e6:>8.1f}  {label}")
+        return "\n".join(lines)
+
+
+regexes = PatternRegistry()
@@ -0,0 +1,107 @@
+import json
+import math
+import time
+
+from patterns import regexes
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list
+    if len(values) == 0:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class SectionProfiler:
+    """
+    Times the sections of parsePage, page by page
+
+    parsePage calls section() at the start of each of its sections, and the caller brackets each page with startPage()
+    and endPage(). All of these return straight away unless profiling is turned on, so the calls can stay in place.
+    When the regex registry is timing too, the time spent in regexes is also split up by section.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.pages = []  # {"url": ..., "seconds": ..., "error": ..., "sections": {name: [seconds, regex seconds]}}
+        self.current = None
+
+    def startPage(self, url):
+        if not self.enabled:
+            return
+        self.current = {"url": url, "seconds": 0.0, "error": None, "sections": {}}
+        self.sectionName = None
+        self.sectionStart = self.pageStart = time.perf_counter()
+        self.sectionRegexStart = regexes.seconds
+
+    def section(self, name):
+        if self.current is None:
+            return
+        now = time.perf_counter()
+        if self.sectionName is not None:
+            times = self.current["sections"].setdefault(self.sectionName, [0.0, 0.0])
+            times[0] += now - self.sectionStart
+            times[1] += regexes.seconds - self.sectionRegexStart
+        self.sectionName = name
+        self.sectionStart = now
+        self.sectionRegexStart = regexes.seconds
+
+    def endPage(self, error=None):
+        if self.current is None:
+            return
+        self.section(None)
+        self.current["seconds"] = time.perf_counter() - self.pageStart
+        if error is not None:  # The page stopped partway through the section it failed in
+            self.current["error"] = error.strip().split("\n")[-1]
+        self.pages.append(self.current)
+        self.current = None
+
+    def stats(self):
+        """
+        Returns:
+            list: One dict per section, in the order parsePage runs them, with its total, p50 and p99 time and its regex time
+        """
+        sections = {}
+        for page in self.pages:
+            for name, (seconds, regexSeconds) in page["sections"].items():
+                x = sections.setdefault(name, {"name": name, "pages": 0, "seconds": 0.0, "regex_seconds": 0.0, "times": []})
+                x["pages"] += 1
+                x["seconds"] += seconds
+                x["regex_seconds"] += regexSeconds
+                x["times"].append(seconds)
+        out = []
+        for x in sections.values():
+            times = sorted(x.pop("times"))
+            x["p50"] = percentile(times, 50)
+            x["p99"] = percentile(times, 99)
+            x["max"] = times[-1]
+            out.append(x)
+        return out
+
+    def slowestPages(self, limit=20):
+        out = []
+        for page in sorted(self.pages, key=lambda page: page["seconds"], reverse=True)[:limit]:
+            slowest = max(page["sections"].items(), key=lambda x: x[1][0], default=(None, [0.0, 0.0]))
+            out.append({"url": page["url"], "seconds": page["seconds"], "slowest_section": slowest[0], "slowest_section_seconds": slowest[1][0], "error": page["error"]})
+        return out
+
+    def report(self, limit=20):
+        if len(self.pages) == 0:
+            return "No pages profiled"
+        total = sum(page["seconds"] for page in self.pages)
+        lines = [f"Profiled {len(self.pages)} pages in {total:.1f}s", "",
+                 f"{'section':<30} {'pages':>6} {'total s':>8} {'share':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'regex%':>6}"]
+        for x in self.stats():
+            lines.append(f"{x['name']:<30} {x['pages']:>6} {x['seconds']:>8.2f} {x['seconds'] / total:>6.1%} {x['p50'] * 1000:>8.2f} {x['p99'] * 1000:>8.2f} {x['max'] * 1000:>8.2f} {x['regex_seconds'] / x['seconds'] if x['seconds'] > 0 else 0:>6.1%}")
+        lines += ["", "Slowest pages:"]
+        for x in self.slowestPages(limit):
+            note = "" if x["error"] is None else "  (failed: " + x["error"] + ")"
+            lines.append(f"{x['seconds'] * 1000:>8.1f} ms  {x['url']}  (slowest section: {x['slowest_section']}, {x['slowest_section_seconds'] * 1000:.1f} ms){note}")
+        return "\n".join(lines)
+
+    def save(self, path, limit=20):
+        with open(path, 'w') as fp:
+            json.dump({"sections": self.stats(), "slowest_pages": self.slowestPages(limit), "pages": self.pages}, fp, indent=1)
+
+
+profiler = SectionProfiler()
@@ -0,0 +1,148 @@
+import time
+import regex as re
+from fractions import Fraction
+
+from leaf_index import splitPath
+
+
+# A small query language over the leaf index, for finding monsters without writing loops over the database, e.g.
+#
+#   CR >= 10, speeds/fly >= 60, type = outsider, has SR
+#
+# Conditions are separated by commas or "and", and a monster has to meet all of them. Each is either a comparison of the
+# leaves at a path (=, !=, <, <=, >, >=) against a value, or "has <path>" for monsters with anything at or below the path.
+# Paths are the keys leading to a leaf, separated by slashes, the same as in unique_leaves. Leaves in a list all count
+# as being at the list's path, so "subtypes = fire" finds monsters with fire among their subtypes. Values in quotes are
+# strings; otherwise numbers (fractions like 1/2 included, as CRs are stored as 0.5), true, false and null are read as
+# such, and anything else is a string. Numbers compare by value, so "CR = 1/2", "CR = 0.5" and "HP/total = 50.0" all work.
+#
+# Each condition is answered from the leaf index: = looks its value up directly (a whole number both as an int and a
+# float, since the index stores the json of each leaf), the other comparisons check each of the path's distinct values
+# and look up the ones that match, and has scans the paths below. The url sets are then intersected, smallest first.
+
+condition_regex = re.compile(r'\s*(?:has\s+(?P<has>"[^"]*"|[^,\s]+)|(?P<path>[^<>=!≤≥,]+?)\s*(?P<op>>=|<=|!=|==|=|<|>|≥|≤)\s*(?P<value>"[^"]*"|[^,<>=!≤≥]*?))\s*(?:,|\band\b|$)', re.I)
+
+operators = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b
+}
+
+
+def parseValue(s):
+    if len(s) >= 2 and s[0] == '"' and s[-1] == '"':
+        return s[1:-1]
+    if s in ["true", "false", "null"]:
+        return {"true": True, "false": False, "null": None}[s]
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        value = float(Fraction(s)) if "/" in s else float(s)
+    except (ValueError, ZeroDivisionError):
+        return s
+    return int(value) if value.is_integer() else value
+
+def isNumber(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+def comparable(a, b):
+    # Numbers compare with numbers and strings with strings, and nothing else matches an ordering
+    return (isNumber(a) and isNumber(b)) or type(a) is type(b)
+
+def equalLeaves(value):
+    # The leaves equal to a value, as the index stores them: 50 and 50.0 are different json, so look up both
+    if isNumber(value) and float(value).is_integer():
+        return [int(value), float(value)]
+    return [value]
+
+
+class Condition:
+    def __init__(self, path, op=None, value=None):
+        self.path = splitPath(path)
+        self.op = op  # None for "has"
+        self.value = value
+
+    def __repr__(self):
+        if self.op is None:
+            return "has " + "/".join(self.path)
+        return f"{'/'.join(self.path)} {self.op} {self.value!r}"
+
+    def run(self, leafIndex):
+        """
+        Returns:
+            tuple: (set of matching urls, description of how the index was used)
+        """
+        if self.op is None:
+            return leafIndex.urlsUnder(self.path), "scan of the paths at and below " + "/".join(self.path)
+        if self.op == "=":
+            values = equalLeaves(self.value)
+            urls = set()
+            for v in values:
+                urls |= leafIndex.urls(self.path, v)
+            return urls, "lookup of the value in leaves(path, value)" if len(values) == 1 else f"{len(values)} lookups of the value (as an int and a float) in leaves(path, value)"
+        values = leafIndex.values(self.path)
+        compare = operators[self.op]
+        matching = [v for v in values if v is not None and comparable(v, self.value) and compare(v, self.value)]
+        urls = set()
+        for v in matching:
+            urls |= leafIndex.urls(self.path, v)
+        return urls, f"check of the {len(values)} distinct values at the path, then {len(matching)} lookups in leaves(path, value)"
+
+
+class Query:
+    """
+    A parsed query, which can be run against (or explained for) a LeafIndex that's up to date
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.conditions = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            result = condition_regex.match(text, pos)
+            if result is None or result.end() == pos:
+                raise ValueError(f"Can't parse the query at {text[pos:]!r}")
+            if result.group("has") is not None:
+                self.conditions.append(Condition(result.group("has").strip('"')))
+            else:
+                op = {"==": "=", "≥": ">=", "≤": "<="}.get(result.group("op"), result.group("op"))
+                self.conditions.append(Condition(result.group("path").strip(), op, parseValue(result.group("value").strip())))
+            pos = result.end()
+        if len(self.conditions) == 0:
+            raise ValueError("Empty query")
+
+    def plan(self, leafIndex):
+        """
+        Run each condition against the index and intersect the results, smallest first
+
+        Returns:
+            tuple: (sorted list of matching urls, list of one dict per step)
+        """
+        steps = []
+        for condition in self.conditions:
+            t = time.perf_counter()
+            urls, access = condition.run(leafIndex)
+            steps.append({"condition": condition, "access": access, "urls": urls, "seconds": time.perf_counter() - t})
+        steps.sort(key=lambda step: len(step["urls"]))
+        result = None
+        for step in steps:
+            result = set(step["urls"]) if result is None else result & step["urls"]
+            step["remaining"] = len(result)
+        return sorted(result), steps
+
+    def run(self, leafIndex):
+        return self.plan(leafIndex)[0]
+
+    def explain(self, leafIndex):
+        result, steps = self.plan(leafIndex)
+        lines = [f"Query: {self.text}", "", f"{'step':>4} {'matches':>8} {'remaining':>9} {'ms':>7}  condition, and how the index was used"]
+        for i, step in enumerate(steps):
+            lines.append(f"{i + 1:>4} {len(step['urls']):>8} {step['remaining']:>9} {step['seconds'] * 1000:>7.2f}  {step['condition']!r}: {step['access']}")
+        lines += ["", f"{len(result)} monsters"]
+        return "\n".join(lines)